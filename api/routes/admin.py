@@ -0,0 +1,59 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from api.routes.books import bulk_indexer, rag_service
+from core.vector_compactor import VectorCompactor
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+# Periodic purge of vectors whose book file is gone, started and stopped with the app
+vector_compactor = VectorCompactor(rag_service)
+# Reference to the running bulk indexing task so it is not garbage collected
+_bulk_index_task: Optional[asyncio.Task] = None
+
+
+@router.post("/index_library")
+async def index_library(
+    force: bool = Query(False, description="Re-index books that already have a checkpoint"),
+    workers: Optional[int] = Query(None, ge=1, description="Books indexed in parallel")
+):
+    """
+    Start indexing every book in the library in the background.
+    Books indexed by a previous (possibly interrupted) run are skipped.
+    """
+    global _bulk_index_task
+
+    if bulk_indexer.running:
+        raise HTTPException(status_code=409, detail="Bulk indexing is already running")
+
+    if workers is not None:
+        bulk_indexer.workers = workers
+    _bulk_index_task = bulk_indexer.start(force=force)
+
+    return {"message": "Bulk indexing started", **bulk_indexer.status()}
+
+
+@router.get("/index_library")
+def get_index_library_status():
+    """Return progress of the running bulk indexing and the summary of the last run."""
+    return bulk_indexer.status()
+
+
+@router.post("/compact_vectors")
+async def compact_vectors():
+    """Purge vectors of books whose EPUB file no longer exists, now."""
+    if vector_compactor.running:
+        raise HTTPException(status_code=409, detail="Vector compaction is already running")
+    return await vector_compactor.run()
+
+
+@router.get("/compact_vectors")
+def get_compact_vectors_status():
+    """Return the schedule and the summary of the last vector compaction."""
+    return vector_compactor.status()
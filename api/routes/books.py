@@ -1,11 +1,30 @@
+import json
 import os
+import zipfile
 from pathlib import Path
-
-from fastapi.responses import Response, HTMLResponse
-from fastapi import APIRouter, UploadFile, Query, HTTPException, File
-from api.services.epub import EPUBData
+from typing import Optional
+
+from fastapi.responses import Response, HTMLResponse, StreamingResponse
+from fastapi import APIRouter, UploadFile, Query, HTTPException, File, Request
+from api.services.archive_pool import archive_pool
+from api.services.book_catalog import SORT_COLUMNS, book_catalog, is_plain_name
+from api.services.book_structure import book_structure_cache
+from api.services.chapters import ChapterService
+from api.services.epub import EPUBData, resource_cache
 from settings import settings
-from api.utils.books_navigation import add_navigation_buttons
+from api.utils.book_version import BookVersion, get_book_version
+from api.utils.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    is_not_modified,
+    last_modified,
+    make_etag,
+)
+from api.utils.http_range import RangeNotSatisfiable, parse_range
+from core.bulk_indexer import BulkIndexer
+from core.executors import executors
+from core.ingestion_jobs import QUEUED, RUNNING, IngestionQueue
+from core.llm_pool import llm_pool
 from core.rag_service import RAGService
 
 
@@ -16,23 +35,41 @@ router = APIRouter(
 
 # Create a single RAG service instance to reuse across endpoints
 rag_service = RAGService()
+chapter_service = ChapterService()
+# Background ingestion, started and stopped with the app
+ingestion_queue = IngestionQueue(rag_service)
+bulk_indexer = BulkIndexer(rag_service)
 
 
 # Endpoint to serve resources from EPUB
 @router.get("/epub_resource")
 async def get_epub_resource(
+        request: Request,
         file_path: str = Query(...),
-        resource_path: str = Query(...)
+        resource_path: str = Query(...),
+        v: Optional[str] = Query(None, description="Book version tag, enables immutable caching")
 ):
     """Serve a resource (CSS, image, etc.) from an EPUB file."""
     file_name = os.path.basename(file_path)
     saved_path = os.path.join(settings.books_path, file_name)
 
-    # Read the resource from the EPUB
     epub_service = EPUBData()
-    resource_content = await epub_service.read_epub_file(saved_path, resource_path)
+    try:
+        version = get_book_version(saved_path)
+        member_info = await epub_service.get_member_info(saved_path, resource_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
+    # Members of a given archive version never change: ETag = archive version + member CRC
+    etag = make_etag(version, member_info.CRC)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified(version),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if v == version.tag else REVALIDATE_CACHE_CONTROL,
+    }
+    if is_not_modified(request.headers, etag, version):
+        return Response(status_code=304, headers=headers)
 
-    # Determine media type based on file extension
     ext = resource_path.lower().split('.')[-1]
     media_types = {
         'css': 'text/css',
@@ -48,15 +85,56 @@ async def get_epub_resource(
     }
     media_type = media_types.get(ext, 'application/octet-stream')
 
-    return Response(content=resource_content, media_type=media_type)
+    size = member_info.file_size
+    # Only stored (uncompressed) members can seek to an offset without inflating everything before it
+    if member_info.compress_type == zipfile.ZIP_STORED:
+        headers["Accept-Ranges"] = "bytes"
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if if_range is not None and if_range != etag:
+            range_header = None
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                epub_service.iter_epub_file(saved_path, resource_path, start=start, length=end - start + 1),
+                status_code=206,
+                media_type=media_type,
+                headers=headers
+            )
+    else:
+        headers["Accept-Ranges"] = "none"
+
+    # Small members are cheaper to send in one piece and are kept in the resource cache
+    if size <= settings.resource_stream_chunk_size:
+        resource_content = await epub_service.read_cached_resource(saved_path, resource_path, version)
+        return Response(content=resource_content, media_type=media_type, headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(
+        epub_service.iter_epub_file(saved_path, resource_path),
+        media_type=media_type,
+        headers=headers
+    )
 
 
 # 1) Upload and store book
 @router.post("/upload_book")
-async def upload_book(file: UploadFile = File(...)):
+async def upload_book(
+    file: UploadFile = File(...),
+    process: bool = Query(True, description="Queue the book for RAG processing")
+):
     """
-    Upload an EPUB file, store it, and process it for RAG.
-    Processing includes: extracting text, chunking, embedding, and storing in vector DB.
+    Upload an EPUB file, store it, and queue it for RAG processing.
+    Processing (extracting text, chunking, embedding, storing in vector DB) runs
+    in the background; poll /book/jobs/{job_id} for its progress.
     """
     # Validate file extension
     if not file.filename.endswith('.epub'):
@@ -65,47 +143,113 @@ async def upload_book(file: UploadFile = File(...)):
     epub_service = EPUBData()
     # Save file to books_stored directory
     saved_path = await epub_service.upload_book(file)
+    chapter_service.invalidate_book(saved_path)
+    await book_catalog.refresh_book(os.path.basename(saved_path))
 
-    # TODO: Make processing optional
-    # Process the book for RAG
-    try:
-        processing_result = await rag_service.process_book(saved_path)
-        
+    if not process:
         return {
-            "message": "Book uploaded and processed successfully",
+            "message": "Book uploaded successfully",
             "filename": file.filename,
-            "path": saved_path,
-            "book_id": processing_result["book_id"],
-            "total_chunks": processing_result["total_chunks"]
-        }
-    except Exception as e:
-        # If processing fails, still return success for upload but warn about processing
-        return {
-            "message": "Book uploaded successfully but processing failed",
-            "filename": file.filename,
-            "path": saved_path,
-            "error": str(e),
-            "warning": "Book may not be available for Q&A until processed"
+            "path": saved_path
         }
 
+    job = await ingestion_queue.submit(saved_path)
+    return {
+        "message": "Book uploaded successfully, processing queued",
+        "filename": file.filename,
+        "path": saved_path,
+        "book_id": Path(saved_path).stem,
+        "job_id": job.job_id,
+        "status_url": f"/book/jobs/{job.job_id}"
+    }
 
-# 2) Get list of stored books
-@router.get("/stored_books")
-def get_stored_books():
-    """Return list of all books stored in the books directory."""
-    book_path = settings.books_path
-    if not os.path.exists(book_path):
-        return {"books": []}
+
+@router.delete("")
+async def delete_book(filename: str = Query(..., description="EPUB filename to delete")):
+    """
+    Delete a stored book together with its vectors, checkpoints and every cache
+    derived from it (parsed structure, open archive, rendered chapters,
+    resources, answers, catalog entry).
+    """
+    filename = os.path.basename(filename)
+    book_id = Path(filename).stem
+    saved_path = os.path.join(settings.books_path, filename)
+    if not os.path.exists(saved_path):
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    # A pending ingestion would store the vectors again after they are deleted
+    for job in ingestion_queue.list_jobs():
+        if job.filename == filename and job.status in (QUEUED, RUNNING):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Book is being processed (job {job.job_id}), delete it once the job has finished"
+            )
 
     epub_service = EPUBData()
-    # Get all .epub files in the directory
-    books = epub_service.get_books()
+    try:
+        await epub_service.delete_book(filename)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    chapter_service.invalidate_book(saved_path)
+    await book_catalog.remove(book_id)
+    await bulk_indexer.forget(filename)
+    deleted_chunks = await executors.run_io(rag_service.vector_store.delete_book, book_id)
+    await executors.run_io(rag_service.ingestion_progress.forget, book_id)
+    if rag_service.answer_cache is not None:
+        rag_service.answer_cache.invalidate_book(book_id)
+
+    return {
+        "message": "Book deleted successfully",
+        "filename": filename,
+        "book_id": book_id,
+        "deleted_chunks": deleted_chunks
+    }
+
+
+@router.get("/jobs")
+def list_jobs():
+    """Return all known ingestion jobs, newest first."""
+    return {"jobs": [job.to_dict() for job in ingestion_queue.list_jobs()]}
 
-    return {"books": books}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Return status and progress of an ingestion job."""
+    job = ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job.to_dict()
+
+
+# 2) Get list of stored books
+@router.get("/stored_books")
+def get_stored_books(
+        offset: int = Query(0, ge=0, description="Number of matching books to skip"),
+        limit: Optional[int] = Query(None, ge=1, description="Page size (default: all)"),
+        q: Optional[str] = Query(None, description="Substring of the filename, title or authors"),
+        author: Optional[str] = Query(None, description="Substring of the authors"),
+        language: Optional[str] = Query(None, description="Language code"),
+        sort: str = Query("filename", description=f"One of: {', '.join(SORT_COLUMNS)}"),
+        desc: bool = Query(False, description="Sort in descending order")
+):
+    """Return a page of the books stored in the books directory, from the book catalog."""
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORT_COLUMNS)}")
+    total, books = book_catalog.list_books(
+        offset=offset, limit=limit, q=q, author=author, language=language, sort=sort, descending=desc
+    )
+    return {
+        "books": [book.to_dict() for book in books],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+    }
 
 
 @router.get("/chapter", response_class=HTMLResponse)
 async def get_chapter(
+        request: Request,
         filename: str = Query(...),
         chapter_index: int = Query(0, ge=0)
 ):
@@ -115,49 +259,28 @@ async def get_chapter(
     saved_path = os.path.join(settings.books_path, filename)
 
     # Check if file exists
-    if not os.path.exists(saved_path):
+    try:
+        version = get_book_version(saved_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    epub_service = EPUBData()
-    # Read container.xml
-    container_xml = await epub_service.read_epub_file(
-        epub_path=saved_path,
-        internal_path='META-INF/container.xml'
-    )
-    container_xml = container_xml.decode('utf-8')
-
-    # Get path to content.opf
-    opf_path = await epub_service.get_opf_path(container_xml)
-
-    # Get ordered XHTML files
-    ordered_files = await epub_service.get_spine_order(saved_path, opf_path)
+    # The ETag only depends on the book version, so revalidation needs no rendering
+    etag = chapter_service.chapter_etag(version, chapter_index)
+    if is_not_modified(request.headers, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL})
 
-    # Validate chapter_index
-    if chapter_index >= len(ordered_files):
-        raise HTTPException(
-            status_code=404,
-            detail=f"Chapter index {chapter_index} out of range. Book has {len(ordered_files)} chapters."
-        )
+    try:
+        rendered = await chapter_service.get_chapter(filename, chapter_index)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Book not found")
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    # Read the requested chapter
-    cur_file = ordered_files[chapter_index]
-    chapter_content = await epub_service.read_epub_file(saved_path, cur_file)
-
-    # Rewrite resource URLs to point to our endpoint
-    chapter_content_str = chapter_content.decode('utf-8') if isinstance(
-        chapter_content, bytes
-    ) else chapter_content
-    modified_content = await epub_service.rewrite_resource_urls(chapter_content_str, saved_path, cur_file)
-
-    # Add navigation buttons
-    modified_content = add_navigation_buttons(
-        modified_content,
-        filename,
-        chapter_index,
-        len(ordered_files)
-    )
+    # Warm the chapter the reader will most likely open next
+    chapter_service.schedule_prefetch(filename, chapter_index, rendered.total_chapters)
 
-    return Response(content=modified_content, media_type="application/xhtml+xml")
+    headers = {"ETag": rendered.etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    return Response(content=rendered.content, media_type="application/xhtml+xml", headers=headers)
 
 
 # Optional: Add an endpoint to get total chapter count
@@ -171,17 +294,9 @@ async def get_chapter_count(filename: str = Query(...)):
         raise HTTPException(status_code=404, detail="Book not found")
 
     epub_service = EPUBData()
-
-    # Read container.xml
-    container_xml = await epub_service.read_epub_file(
-        epub_path=saved_path,
-        internal_path='META-INF/container.xml'
-    )
-    container_xml = container_xml.decode('utf-8')
-    # Get path to content.opf
-    opf_path = await epub_service.get_opf_path(container_xml)
     # Get ordered XHTML files
-    ordered_files = await epub_service.get_spine_order(saved_path, opf_path)
+    structure = await epub_service.get_book_structure(saved_path)
+    ordered_files = structure.spine
 
     return {
         "filename": filename,
@@ -190,16 +305,35 @@ async def get_chapter_count(filename: str = Query(...)):
     }
 
 
+@router.get("/cache_stats")
+def get_cache_stats():
+    """Return counters of the EPUB, chapter, embedding and answer caches, the embedding client, the LLM pool and the catalog."""
+    return {
+        "book_structures": book_structure_cache.stats(),
+        "archives": archive_pool.stats(),
+        "resources": resource_cache.stats(),
+        **chapter_service.stats(),
+        "embeddings": rag_service.embedding_service.cache_stats(),
+        "embedding_client": rag_service.embedding_service.client_stats(),
+        "answers": rag_service.answer_cache.stats() if rag_service.answer_cache is not None else None,
+        "llm_pool": llm_pool.stats(),
+        "catalog": book_catalog.stats(),
+    }
+
+
 @router.post("/process_book")
 async def process_book(
-    filename: str = Query(..., description="EPUB filename to process for RAG")
+    filename: str = Query(..., description="EPUB filename to process for RAG"),
+    force: bool = Query(False, description="Re-chunk the book even if the file is unchanged")
 ):
     """
     Process a book for RAG: extract text, chunk, embed, and store in vector DB.
     Useful for processing existing uploaded books or reprocessing books.
+    Unchanged books are skipped; for changed ones only new chunks are embedded.
     
     Args:
         filename: EPUB filename to process (e.g., "book.epub")
+        force: Re-chunk the book even if the file is unchanged
         
     Returns:
         Processing results with book_id and total_chunks
@@ -219,13 +353,16 @@ async def process_book(
     
     # Process the book for RAG
     try:
-        processing_result = await rag_service.process_book(saved_path)
+        processing_result = await rag_service.process_book(saved_path, force=force)
         
         return {
             "message": "Book processed successfully",
             "filename": filename,
             "book_id": processing_result["book_id"],
-            "total_chunks": processing_result["total_chunks"]
+            "total_chunks": processing_result["total_chunks"],
+            "new_chunks": processing_result["new_chunks"],
+            "deleted_chunks": processing_result["deleted_chunks"],
+            "skipped": processing_result["skipped"]
         }
     except Exception as e:
         raise HTTPException(
@@ -234,6 +371,35 @@ async def process_book(
         )
 
 
+async def _find_book(book_id: str) -> tuple[str, BookVersion]:
+    """
+    Get the stored path and version of a book from the catalog
+    :param book_id: book identifier (filename without .epub extension)
+    :return: (path of the EPUB file, file version)
+    :raises HTTPException: 404 if no stored book matches
+    """
+    not_found = HTTPException(
+        status_code=404,
+        detail=f"Book with ID '{book_id}' not found. Make sure the book is uploaded."
+    )
+    # Only names inside the books directory are looked up
+    if not is_plain_name(book_id):
+        raise not_found
+    record = book_catalog.get(book_id)
+    # Files copied into the directory are picked up before the next catalog poll
+    filename = record.filename if record is not None else f"{book_id}.epub"
+    book_path = os.path.join(settings.books_path, filename)
+    try:
+        version = get_book_version(book_path)
+    except FileNotFoundError:
+        if record is not None:
+            await book_catalog.remove(book_id)
+        raise not_found
+    if record is None:
+        await book_catalog.refresh_book(filename)
+    return book_path, version
+
+
 @router.post("/ask")
 async def ask_question(
     book_id: str = Query(..., description="Book ID (filename without .epub extension)"),
@@ -253,29 +419,14 @@ async def ask_question(
         404: If book is not found or not processed
         500: If there's an error processing the question
     """
-    # Check if book file exists
-    epub_service = EPUBData()
-    books = epub_service.get_books()
-    
-    # Find book by ID (check if any book filename matches)
-    book_file = None
-    for book in books:
-        # book_id is the stem (filename without extension)
-        if Path(book["filename"]).stem == book_id:
-            book_file = book
-            break
-    
-    if not book_file:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Book with ID '{book_id}' not found. Make sure the book is uploaded."
-        )
+    _, book_version = await _find_book(book_id)
     
     # Answer the question
     try:
         answer = await rag_service.answer_question(
             question=question,
-            book_id=book_id
+            book_id=book_id,
+            book_version=book_version.tag
         )
         
         # Check if we got an answer (empty context might return empty answer)
@@ -296,4 +447,63 @@ async def ask_question(
         raise HTTPException(
             status_code=500,
             detail=f"Error answering question: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.api_route("/ask/stream", methods=["GET", "POST"])
+async def ask_question_stream(
+    book_id: str = Query(..., description="Book ID (filename without .epub extension)"),
+    question: str = Query(..., description="Question to ask about the book")
+):
+    """
+    Ask a question about a book and stream the answer as Server-Sent Events.
+    
+    Events, in order:
+        sources: retrieved chunks, sent as soon as retrieval is done
+        token: generated text fragment (repeated)
+        done: {"answer": full answer}
+        error: {"detail": message}, sent instead of the remaining events on failure
+    
+    Args:
+        book_id: Book identifier (filename without .epub extension)
+        question: Question to ask
+        
+    Raises:
+        404: If book is not found
+    """
+    _, version = await _find_book(book_id)
+    book_version = version.tag
+    
+    async def events():
+        try:
+            async for event, payload in rag_service.stream_answer(
+                question=question,
+                book_id=book_id,
+                book_version=book_version
+            ):
+                if event == "sources":
+                    if not payload:
+                        yield _sse_event("error", {
+                            "detail": f"Book '{book_id}' may not be processed yet. Please re-upload the book to process it."
+                        })
+                        return
+                    yield _sse_event("sources", [
+                        {"content": doc.page_content, "metadata": doc.metadata} for doc in payload
+                    ])
+                elif event == "token":
+                    yield _sse_event("token", payload)
+                else:
+                    yield _sse_event("done", {"answer": payload})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error answering question: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,168 @@
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from settings import settings
+from api.utils.book_version import BookVersion, get_book_version
+
+
+class ArchiveHandle:
+    """
+    Long-lived open EPUB archive with an O(1) member index.
+
+    Attributes:
+        path (str): absolute path of the epub file
+        version (BookVersion): file version the handle was opened for
+        members (dict): member name → ZipInfo
+    """
+    def __init__(self, path: str, version: BookVersion):
+        self.path = path
+        self.version = version
+        self.zip = zipfile.ZipFile(path, 'r')
+        self.members: dict[str, zipfile.ZipInfo] = {info.filename: info for info in self.zip.infolist()}
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._retired = False
+
+    def get_info(self, internal_path: str) -> zipfile.ZipInfo:
+        """
+        Get ZipInfo of an archive member
+        :param internal_path: path inside the archive
+        :return: ZipInfo
+        """
+        info = self.members.get(internal_path)
+        if info is None:
+            raise FileNotFoundError(f"{internal_path} not found in EPUB")
+        return info
+
+    def open(self, internal_path: str) -> zipfile.ZipExtFile:
+        """
+        Open an archive member for streaming reads
+        :param internal_path: path inside the archive
+        :return: file-like object of the member
+        """
+        info = self.get_info(internal_path)
+        # ZipFile.open mutates the shared file refcount, reads themselves are locked by zipfile
+        with self._lock:
+            return self.zip.open(info)
+
+    def read(self, internal_path: str) -> bytes:
+        """
+        Read the whole archive member
+        :param internal_path: path inside the archive
+        :return: member content
+        """
+        with self.open(internal_path) as member:
+            return member.read()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._refs += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._refs -= 1
+            close = self._retired and self._refs == 0
+        if close:
+            self.zip.close()
+
+    def retire(self) -> None:
+        """Close the archive as soon as the last reader releases it."""
+        with self._lock:
+            self._retired = True
+            close = self._refs == 0
+        if close:
+            self.zip.close()
+
+
+class ArchivePool:
+    """
+    Bounded LRU pool of open EPUB archives keyed by path.
+    A handle is replaced when the file mtime or size changes.
+    """
+    def __init__(self, max_handles: int):
+        self.max_handles = max_handles
+        self._handles: OrderedDict[str, ArchiveHandle] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _checkout(self, epub_path: str | os.PathLike, version: Optional[BookVersion]) -> ArchiveHandle:
+        path = os.path.abspath(epub_path)
+        if version is None:
+            version = get_book_version(path)
+
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and handle.version == version:
+                self._handles.move_to_end(path)
+                self.hits += 1
+                handle.acquire()
+                return handle
+            self.misses += 1
+
+        # Opening reads the central directory: done outside the lock so other books are not blocked
+        opened = ArchiveHandle(path, version)
+        retired = []
+        with self._lock:
+            handle = self._handles.get(path)
+            if handle is not None and handle.version == version:
+                # Another thread opened the same version meanwhile
+                retired.append(opened)
+            else:
+                if handle is not None:
+                    del self._handles[path]
+                    retired.append(handle)
+                handle = opened
+                self._handles[path] = handle
+                while len(self._handles) > self.max_handles:
+                    _, evicted = self._handles.popitem(last=False)
+                    retired.append(evicted)
+            self._handles.move_to_end(path)
+            handle.acquire()
+        for old in retired:
+            old.retire()
+        return handle
+
+    @contextmanager
+    def handle(self, epub_path: str | os.PathLike,
+               version: Optional[BookVersion] = None) -> Iterator[ArchiveHandle]:
+        """
+        Borrow an open archive handle for the current version of the file
+        :param epub_path: path to the epub file
+        :param version: already known file version (stat is done otherwise)
+        :return: ArchiveHandle, released on exit
+        """
+        handle = self._checkout(epub_path, version)
+        try:
+            yield handle
+        finally:
+            handle.release()
+
+    def invalidate(self, epub_path: str | os.PathLike) -> None:
+        with self._lock:
+            handle = self._handles.pop(os.path.abspath(epub_path), None)
+        if handle is not None:
+            handle.retire()
+
+    def close_all(self) -> None:
+        with self._lock:
+            handles = list(self._handles.values())
+            self._handles.clear()
+        for handle in handles:
+            handle.retire()
+
+    def stats(self) -> dict:
+        return {
+            "open_handles": len(self._handles),
+            "max_handles": self.max_handles,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Shared by every EPUBData instance
+archive_pool = ArchivePool(settings.archive_pool_size)
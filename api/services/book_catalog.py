@@ -0,0 +1,290 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from settings import settings
+from api.services.epub import EPUBData
+from core.executors import executors
+
+
+logger = logging.getLogger(__name__)
+
+
+# Columns /stored_books can be sorted by
+SORT_COLUMNS = {
+    "filename": "filename COLLATE NOCASE",
+    "title": "COALESCE(title, filename) COLLATE NOCASE",
+    "size": "size",
+    "modified": "mtime_ns",
+    "chapters": "chapter_count",
+}
+
+
+def is_plain_name(name: str) -> bool:
+    """True if name is a bare file name, i.e. cannot point outside the books directory."""
+    return (bool(name) and name not in (".", "..") and name == os.path.basename(name)
+            and os.sep not in name and not (os.altsep and os.altsep in name))
+
+
+def _escape_like(text: str) -> str:
+    # Search text is literal: % and _ are not wildcards
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@dataclass
+class BookRecord:
+    """
+    Catalog entry of one stored book.
+
+    Attributes:
+        filename (str): file name inside the books directory
+        size (int): file size in bytes
+        mtime_ns (int): modification time the metadata was read from
+        title (str): OPF title, None if missing or unreadable
+        authors (list): OPF creators
+        language (str): OPF language
+        chapter_count (int): number of spine items
+        error (str): why the OPF could not be read, None otherwise
+    """
+    filename: str
+    size: int
+    mtime_ns: int
+    title: Optional[str] = None
+    authors: list = field(default_factory=list)
+    language: Optional[str] = None
+    chapter_count: int = 0
+    error: Optional[str] = None
+
+    @property
+    def book_id(self) -> str:
+        return Path(self.filename).stem
+
+    @property
+    def path(self) -> str:
+        return os.path.join(settings.books_path, self.filename)
+
+    def to_dict(self) -> dict:
+        return {"book_id": self.book_id, **asdict(self), "path": self.path}
+
+
+class BookCatalog:
+    """
+    Indexed catalog of the books directory: book id (file stem) → BookRecord.
+
+    Records live in memory for O(1) lookups and are persisted in SQLite, so a
+    restart only re-reads books whose (mtime, size) changed. The directory is
+    polled for added, replaced and removed files; uploads are registered
+    immediately with refresh_book().
+    """
+    def __init__(self, db_path: str, books_dir: str | os.PathLike, poll_interval: float = 30.0):
+        self.db_path = db_path
+        self.books_dir = str(books_dir)
+        self.poll_interval = poll_interval
+        self._records: dict[str, BookRecord] = {}
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self.last_refresh: Optional[float] = None
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS books (
+                book_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                title TEXT,
+                authors TEXT NOT NULL,
+                language TEXT,
+                chapter_count INTEGER NOT NULL,
+                error TEXT
+            )
+            """
+        )
+        self._conn.commit()
+        for row in self._conn.execute(
+                "SELECT filename, size, mtime_ns, title, authors, language, chapter_count, error FROM books"):
+            record = BookRecord(*row[:4], json.loads(row[4]), *row[5:])
+            self._records[record.book_id] = record
+
+    @classmethod
+    def from_settings(cls) -> "BookCatalog":
+        return cls(settings.catalog_path, settings.books_path, settings.catalog_poll_interval)
+
+    def get(self, book_id: str) -> Optional[BookRecord]:
+        return self._records.get(book_id)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def _read_record(self, filename: str, size: int, mtime_ns: int) -> BookRecord:
+        record = BookRecord(filename=filename, size=size, mtime_ns=mtime_ns)
+        try:
+            structure = await EPUBData().get_book_structure(os.path.join(self.books_dir, filename))
+        except Exception as e:
+            # Still listed, like any .epub in the directory
+            record.error = str(e)
+            return record
+        record.title = structure.metadata.get("title")
+        record.authors = list(structure.metadata.get("authors") or [])
+        record.language = structure.metadata.get("language")
+        record.chapter_count = len(structure.spine)
+        return record
+
+    def _save(self, records: list[BookRecord], removed: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO books VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r.book_id, r.filename, r.size, r.mtime_ns, r.title, json.dumps(r.authors),
+                  r.language, r.chapter_count, r.error) for r in records]
+            )
+            self._conn.executemany("DELETE FROM books WHERE book_id = ?", [(book_id,) for book_id in removed])
+            self._conn.commit()
+
+    def _scan(self) -> dict[str, os.stat_result]:
+        if not os.path.isdir(self.books_dir):
+            return {}
+        with os.scandir(self.books_dir) as entries:
+            return {entry.name: entry.stat() for entry in entries
+                    if entry.name.endswith('.epub') and entry.is_file()}
+
+    async def refresh(self) -> dict:
+        """
+        Bring the catalog in line with the books directory: one directory scan,
+        OPF reads only for new or changed files
+        :return: dict with the number of added/updated and removed books
+        """
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            files = await executors.run_io(self._scan)
+            changed = []
+            for filename, stat in files.items():
+                record = self._records.get(Path(filename).stem)
+                if record is None or (record.mtime_ns, record.size, record.filename) != (
+                        stat.st_mtime_ns, stat.st_size, filename):
+                    changed.append(await self._read_record(filename, stat.st_size, stat.st_mtime_ns))
+            present = {Path(filename).stem for filename in files}
+            removed = [book_id for book_id in self._records if book_id not in present]
+
+            if changed or removed:
+                await executors.run_io(self._save, changed, removed)
+            for record in changed:
+                self._records[record.book_id] = record
+            for book_id in removed:
+                del self._records[book_id]
+            self.last_refresh = time.time()
+            return {"updated": len(changed), "removed": len(removed)}
+
+    async def refresh_book(self, filename: str) -> Optional[BookRecord]:
+        """
+        Re-read a single book, e.g. right after it was uploaded
+        :param filename: file name inside the books directory
+        :return: new record, None if the file no longer exists
+        :raises ValueError: if filename is not a bare file name
+        """
+        if not is_plain_name(filename):
+            raise ValueError(f"Invalid book filename: '{filename}'")
+        path = os.path.join(self.books_dir, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            await self.remove(Path(filename).stem)
+            return None
+        record = await self._read_record(filename, stat.st_size, stat.st_mtime_ns)
+        await executors.run_io(self._save, [record], [])
+        self._records[record.book_id] = record
+        return record
+
+    async def remove(self, book_id: str) -> None:
+        """
+        Drop a book from the catalog
+        :param book_id: book identifier (file stem)
+        """
+        self._records.pop(book_id, None)
+        await executors.run_io(self._save, [], [book_id])
+
+    def list_books(self, offset: int = 0, limit: Optional[int] = None, q: Optional[str] = None,
+                   author: Optional[str] = None, language: Optional[str] = None,
+                   sort: str = "filename", descending: bool = False) -> tuple[int, list[BookRecord]]:
+        """
+        Query the catalog
+        :param offset: number of matching books to skip
+        :param limit: maximum number of books returned (None = all)
+        :param q: case-insensitive substring of the filename, title or authors
+        :param author: case-insensitive substring of the authors
+        :param language: exact language code
+        :param sort: one of SORT_COLUMNS
+        :param descending: reverse the sort order
+        :return: (total number of matching books, requested page)
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort: '{sort}'. Use one of: {', '.join(SORT_COLUMNS)}")
+        conditions, params = [], []
+        if q:
+            conditions.append("(filename LIKE ? ESCAPE '\\' OR title LIKE ? ESCAPE '\\' OR authors LIKE ? ESCAPE '\\')")
+            params += [f"%{_escape_like(q)}%"] * 3
+        if author:
+            conditions.append("authors LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(author)}%")
+        if language:
+            conditions.append("language = ? COLLATE NOCASE")
+            params.append(language)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = f"{SORT_COLUMNS[sort]} {'DESC' if descending else 'ASC'}, book_id"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM books {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT book_id FROM books {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                [*params, -1 if limit is None else limit, offset]
+            ).fetchall()
+        return total, [self._records[book_id] for (book_id,) in rows if book_id in self._records]
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Try again on the next tick
+                logger.exception("Catalog refresh of %s failed", self.books_dir)
+
+    async def start(self) -> None:
+        """Refresh once and keep polling the books directory for changes."""
+        await self.refresh()
+        if self.poll_interval > 0 and self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "books": len(self._records),
+            "poll_interval": self.poll_interval,
+            "last_refresh": self.last_refresh,
+        }
+
+
+book_catalog = BookCatalog.from_settings()
@@ -0,0 +1,92 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from settings import settings
+from api.services.parsers import ManifestItem, get_parser
+from api.utils.book_version import BookVersion, get_book_version
+from api.utils.lru_cache import LRUCache
+
+
+CONTAINER_PATH = 'META-INF/container.xml'
+
+
+@dataclass(frozen=True)
+class BookStructure:
+    """
+    Parsed container.xml and OPF of a single book version.
+
+    Attributes:
+        opf_path (str): path of the OPF package document inside the archive
+        manifest (dict): manifest id → ManifestItem
+        spine (list): ordered chapter paths inside the archive
+        metadata (dict): Dublin Core metadata (title, authors, language, ...)
+    """
+    opf_path: str
+    manifest: dict[str, ManifestItem]
+    spine: list[str]
+    metadata: dict = field(default_factory=dict)
+
+
+def parse_opf_path(container_xml: str) -> str:
+    """
+    Return the path to the OPF file declared in container.xml
+    :param container_xml: content of META-INF/container.xml
+    :return: path to the OPF file inside the archive
+    """
+    return get_parser().opf_path(container_xml)
+
+
+def parse_opf(opf_content: str, opf_path: str) -> tuple[dict[str, ManifestItem], list[str], dict]:
+    """
+    Parse the OPF package document
+    :param opf_content: content of the OPF file
+    :param opf_path: path of the OPF file inside the archive
+    :return: (manifest, spine, metadata)
+    """
+    return get_parser().parse_opf(opf_content, opf_path)
+
+
+class BookStructureCache:
+    """
+    LRU cache of parsed book structures keyed by file path.
+    Every entry remembers the (mtime, size) it was parsed from, so a replaced
+    file is re-parsed on the next lookup.
+    """
+    def __init__(self, max_entries: int):
+        self._cache = LRUCache(max_entries)
+
+    @staticmethod
+    def _key(epub_path: str | os.PathLike) -> str:
+        return os.path.abspath(epub_path)
+
+    def get(self, epub_path: str | os.PathLike,
+            version: Optional[BookVersion] = None) -> Optional[BookStructure]:
+        """
+        Get cached structure if it belongs to the current file version
+        :param epub_path: path to the epub file
+        :param version: already known file version (stat is done otherwise)
+        :return: BookStructure or None
+        """
+        if version is None:
+            version = get_book_version(epub_path)
+        entry = self._cache.get(self._key(epub_path))
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, epub_path: str | os.PathLike, version: BookVersion, structure: BookStructure) -> None:
+        self._cache.put(self._key(epub_path), (version, structure))
+
+    def invalidate(self, epub_path: str | os.PathLike) -> None:
+        self._cache.pop(self._key(epub_path))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Shared by every EPUBData instance
+book_structure_cache = BookStructureCache(settings.book_structure_cache_size)
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import os
+from typing import NamedTuple
+
+from settings import settings
+from api.services.epub import EPUBData, resource_cache
+from api.utils.book_version import BookVersion, get_book_version
+from api.utils.books_navigation import navigation_segments
+from api.utils.http_cache import make_etag
+from api.utils.lru_cache import LRUCache
+from api.utils.resource_urls import referenced_resources, rewrite_resource_urls
+from core.executors import executors
+
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedChapter(NamedTuple):
+    """Final bytes of a chapter page as sent to the reader."""
+    content: bytes
+    etag: str
+    total_chapters: int
+
+
+# Rendered pages keyed by (book path, book version, chapter index)
+rendered_chapter_cache = LRUCache(
+    max_entries=settings.chapter_cache_max_entries,
+    max_bytes=settings.chapter_cache_max_bytes
+)
+
+
+def render_chapter_page(chapter_content: bytes, file_path: str, chapter_path: str, version_tag: str,
+                        filename: str, chapter_index: int, total_chapters: int) -> bytes:
+    """
+    Build the page sent to the reader from the raw chapter (CPU-bound, picklable for process pools)
+    :param chapter_content: raw XHTML of the chapter
+    :param file_path: path to the epub file
+    :param chapter_path: path of the chapter inside the archive
+    :param version_tag: book version tag added to resource URLs
+    :param filename: epub filename used in navigation links
+    :param chapter_index: index of the chapter in the spine
+    :param total_chapters: number of chapters in the book
+    :return: encoded page
+    """
+    # Rewrite resource URLs to point to our endpoint
+    chapter_content_str = chapter_content.decode('utf-8') if isinstance(
+        chapter_content, bytes
+    ) else chapter_content
+    modified_content = rewrite_resource_urls(chapter_content_str, file_path, chapter_path, version_tag)
+
+    # Add navigation buttons
+    segments = navigation_segments(
+        modified_content,
+        filename,
+        chapter_index,
+        total_chapters
+    )
+    return ''.join(segments).encode('utf-8')
+
+
+class ChapterService:
+    """
+    Renders chapters for the reader: rewrites resource URLs, adds navigation
+    and keeps the resulting page in rendered_chapter_cache.
+    After a chapter is served the following one(s) can be prefetched in the
+    background, together with the small resources they reference.
+    """
+    def __init__(self, epub_service: EPUBData | None = None):
+        self.epub_service = epub_service or EPUBData()
+        # Keys rendered by prefetch and not requested by a reader yet
+        self._prefetched = LRUCache(max_entries=settings.chapter_cache_max_entries)
+        # (book path, chapter index) prefetch was asked to warm, whether it got to run or not
+        self._prefetch_targets = LRUCache(max_entries=settings.chapter_cache_max_entries)
+        self._prefetch_tasks: set[asyncio.Task] = set()
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.prefetched_chapters = 0
+        self.prefetch_skipped = 0
+
+    @staticmethod
+    def _cache_key(saved_path: str, version: BookVersion, chapter_index: int) -> tuple:
+        return os.path.abspath(saved_path), version, chapter_index
+
+    @staticmethod
+    def chapter_etag(version: BookVersion, chapter_index: int) -> str:
+        """
+        ETag of a rendered chapter page, known without rendering it
+        :param version: book version
+        :param chapter_index: index of the chapter in the spine
+        :return: ETag header value
+        """
+        return make_etag(version, "ch", chapter_index)
+
+    async def get_chapter(self, filename: str, chapter_index: int) -> RenderedChapter:
+        """
+        Get a rendered chapter page, from cache if this book version was rendered before
+        :param filename: epub filename in the books directory
+        :param chapter_index: index of the chapter in the spine
+        :return: RenderedChapter
+        :raises FileNotFoundError: if the book does not exist
+        :raises IndexError: if chapter_index is out of range
+        """
+        saved_path = os.path.join(settings.books_path, filename)
+        version = get_book_version(saved_path)
+        key = self._cache_key(saved_path, version, chapter_index)
+
+        targeted = self._prefetch_targets.pop((os.path.abspath(saved_path), chapter_index)) is not None
+        rendered = rendered_chapter_cache.get(key)
+        if rendered is not None:
+            if self._prefetched.pop(key) is not None:
+                self.prefetch_hits += 1
+            return rendered
+
+        # Only chapters prefetch should have warmed count, not every cold request
+        if targeted:
+            self.prefetch_misses += 1
+        rendered, _ = await self._render(filename, saved_path, version, chapter_index)
+        return rendered
+
+    async def _render(self, filename: str, saved_path: str, version: BookVersion,
+                      chapter_index: int) -> tuple[RenderedChapter, bytes]:
+        """
+        Render a chapter and store it in rendered_chapter_cache
+        :return: (RenderedChapter, raw chapter content)
+        """
+        # Get ordered XHTML files
+        structure = await self.epub_service.get_book_structure(saved_path)
+        ordered_files = structure.spine
+
+        # Validate chapter_index
+        if chapter_index >= len(ordered_files):
+            raise IndexError(
+                f"Chapter index {chapter_index} out of range. Book has {len(ordered_files)} chapters."
+            )
+
+        # Read the requested chapter
+        cur_file = ordered_files[chapter_index]
+        chapter_content = await self.epub_service.read_epub_file(saved_path, cur_file)
+
+        content = await executors.run_cpu(
+            render_chapter_page,
+            chapter_content,
+            saved_path,
+            cur_file,
+            version.tag,
+            filename,
+            chapter_index,
+            len(ordered_files)
+        )
+        rendered = RenderedChapter(
+            content=content,
+            etag=self.chapter_etag(version, chapter_index),
+            total_chapters=len(ordered_files)
+        )
+        rendered_chapter_cache.put(self._cache_key(saved_path, version, chapter_index), rendered, size=len(content))
+        return rendered, chapter_content
+
+    def schedule_prefetch(self, filename: str, chapter_index: int, total_chapters: int) -> None:
+        """
+        Warm the chapters a reader is likely to open next in the background.
+        Uses settings.chapter_prefetch_depth / chapter_prefetch_previous and
+        skips the work when chapter_prefetch_max_concurrency tasks are running.
+        :param filename: epub filename in the books directory
+        :param chapter_index: chapter that was just served
+        :param total_chapters: number of chapters in the book
+        """
+        depth = settings.chapter_prefetch_depth
+        targets = [i for i in range(chapter_index + 1, chapter_index + 1 + depth) if i < total_chapters]
+        if settings.chapter_prefetch_previous and depth > 0 and chapter_index > 0:
+            targets.append(chapter_index - 1)
+        if not targets:
+            return
+        saved_path = os.path.abspath(os.path.join(settings.books_path, filename))
+        for target in targets:
+            self._prefetch_targets.put((saved_path, target), True)
+
+        if len(self._prefetch_tasks) >= settings.chapter_prefetch_max_concurrency:
+            self.prefetch_skipped += 1
+            return
+
+        task = asyncio.create_task(self._prefetch(filename, targets))
+        # Keep a reference so the task is not garbage collected while running
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def _prefetch(self, filename: str, chapter_indexes: list[int]) -> None:
+        saved_path = os.path.join(settings.books_path, filename)
+        try:
+            version = get_book_version(saved_path)
+            for chapter_index in chapter_indexes:
+                key = self._cache_key(saved_path, version, chapter_index)
+                if key in rendered_chapter_cache:
+                    continue
+                _, chapter_content = await self._render(filename, saved_path, version, chapter_index)
+                self._prefetched.put(key, True)
+                self.prefetched_chapters += 1
+
+                structure = await self.epub_service.get_book_structure(saved_path)
+                await self._prefetch_resources(saved_path, version, chapter_content.decode('utf-8'),
+                                               structure.spine[chapter_index])
+        except (FileNotFoundError, IndexError):
+            # Book removed or replaced meanwhile, nothing to warm
+            pass
+        except Exception:
+            # Broken archive or chapter: the reader gets the error when opening it, not from here
+            logger.debug("Prefetch of %s chapters %s failed", filename, chapter_indexes, exc_info=True)
+
+    async def _prefetch_resources(self, saved_path: str, version: BookVersion,
+                                  chapter_content: str, chapter_path: str) -> None:
+        """Load the small resources of a chapter into the resource cache."""
+        for resource_path in referenced_resources(chapter_content, chapter_path):
+            try:
+                info = await self.epub_service.get_member_info(saved_path, resource_path)
+            except FileNotFoundError:
+                continue
+            # Only what the resource endpoint serves from cache is worth warming
+            if info.file_size <= settings.resource_stream_chunk_size and not resource_path.endswith(
+                    ('.xhtml', '.html', '.htm')):
+                await self.epub_service.read_cached_resource(saved_path, resource_path, version)
+
+    def stats(self) -> dict:
+        """
+        Get rendered chapter cache and prefetch counters
+        :return: dict with counters
+        """
+        return {
+            "rendered_chapters": rendered_chapter_cache.stats(),
+            "prefetch": {
+                "depth": settings.chapter_prefetch_depth,
+                "hits": self.prefetch_hits,
+                "misses": self.prefetch_misses,
+                "prefetched_chapters": self.prefetched_chapters,
+                "skipped": self.prefetch_skipped,
+                "running": len(self._prefetch_tasks),
+            },
+        }
+
+    @staticmethod
+    def invalidate_book(epub_path: str) -> int:
+        """
+        Drop every rendered chapter and cached resource of a book
+        :param epub_path: path to the epub file
+        :return: number of dropped pages
+        """
+        path = os.path.abspath(epub_path)
+        resource_cache.pop_matching(lambda key: key[0] == path)
+        return rendered_chapter_cache.pop_matching(lambda key: key[0] == path)
@@ -1,11 +1,74 @@
+import asyncio
 import os
 import zipfile
-import re
+from typing import AsyncIterator, Iterator, Optional
 
 from settings import settings
 from fastapi import UploadFile
-from bs4 import BeautifulSoup
-from urllib.parse import quote
+
+from api.services.archive_pool import archive_pool
+from api.services.parsers import get_parser
+from api.services.book_structure import (
+    CONTAINER_PATH,
+    BookStructure,
+    book_structure_cache,
+    parse_opf,
+    parse_opf_path,
+)
+from api.utils.book_version import BookVersion, get_book_version
+from api.utils.lru_cache import LRUCache
+from api.utils.resource_urls import rewrite_resource_urls
+from core.executors import executors
+
+
+# Small resources (CSS, images) keyed by (book path, book version, member path)
+resource_cache = LRUCache(max_entries=8192, max_bytes=settings.resource_cache_max_bytes)
+
+
+def read_member(epub_path: str, internal_path: str, version: Optional[BookVersion] = None) -> bytes:
+    """
+    Read an archive member through the archive pool (blocking)
+    :param epub_path: path to the epub file
+    :param internal_path: path inside the archive
+    :param version: already known file version (stat is done otherwise)
+    :return: member content
+    """
+    with archive_pool.handle(epub_path, version) as archive:
+        return archive.read(internal_path)
+
+
+def member_info(epub_path: str, internal_path: str) -> zipfile.ZipInfo:
+    """
+    Get ZipInfo of an archive member through the archive pool (blocking)
+    :param epub_path: path to the epub file
+    :param internal_path: path inside the archive
+    :return: ZipInfo of the member
+    """
+    with archive_pool.handle(epub_path) as archive:
+        return archive.get_info(internal_path)
+
+
+def extract_chapter_text(chapter_content: bytes | str) -> str:
+    """
+    Extract plain text of one XHTML chapter (CPU-bound, picklable for process pools)
+    :param chapter_content: raw chapter content
+    :return: text with one line per text node
+    """
+    chapter_str = chapter_content.decode('utf-8') if isinstance(
+        chapter_content, bytes
+    ) else chapter_content
+    return get_parser().chapter_text(chapter_str)
+
+
+def extract_chapters_text(epub_path: str, chapter_paths: list[str]) -> list[str]:
+    """
+    Read and extract text of several chapters (runs in a worker process)
+    :param epub_path: path to the epub file
+    :param chapter_paths: chapter paths inside the archive
+    :return: text of each chapter, in the given order
+    """
+    with archive_pool.handle(epub_path) as archive:
+        return [extract_chapter_text(archive.read(chapter_path)) for chapter_path in chapter_paths]
 
 
 class EPUBData:
@@ -28,9 +91,33 @@ class EPUBData:
         """
         saved_path = os.path.join(self.books_storage, file.filename)
 
-        with open(saved_path, 'wb') as dst:
+        # Disk writes run in the I/O pool so a large upload does not block other requests
+        dst = await executors.run_io(open, saved_path, 'wb')
+        try:
             while chunk := await file.read(settings.chunk_size):
-                dst.write(chunk)
+                await executors.run_io(dst.write, chunk)
+        finally:
+            await executors.run_io(dst.close)
+
+        # Drop handles and parsed data of a previous file with the same name
+        archive_pool.invalidate(saved_path)
+        book_structure_cache.invalidate(saved_path)
+
+        return saved_path
+
+    async def delete_book(self, filename: str) -> str:
+        """
+        Remove a book from the books_stored directory
+        :param filename: name of the epub file
+        :return: path of the removed file
+        :raises FileNotFoundError: if the book does not exist
+        """
+        saved_path = os.path.join(self.books_storage, os.path.basename(filename))
+
+        # Close pooled handles before the file goes away
+        archive_pool.invalidate(saved_path)
+        book_structure_cache.invalidate(saved_path)
+        await executors.run_io(os.remove, saved_path)
 
         return saved_path
 
@@ -56,35 +143,104 @@ class EPUBData:
         Return the path to container.xml
         :return:
         """
-        soup = BeautifulSoup(container_xml, 'xml')
-        rootfile = soup.find('rootfile')
-        if not rootfile or not rootfile.has_attr('full-path'):
-            raise ValueError("OPF path not found in container.xml")
-        return rootfile['full-path']
+        return parse_opf_path(container_xml)
 
     async def get_spine_order(self, epub_path: str, opf_path: str) -> list[str]:
 
         opf_content = await self.read_epub_file(epub_path=epub_path, internal_path=opf_path)
         opf_content = opf_content.decode('utf-8')
 
-        soup = BeautifulSoup(opf_content, 'xml')
+        _, spine, _ = parse_opf(opf_content, opf_path)
+        return spine
+
+    async def get_book_structure(self, epub_path: str) -> BookStructure:
+        """
+        Get parsed container.xml/OPF data of the book, served from the
+        structure cache while the file keeps the same mtime and size
+        :param epub_path: path to the epub file
+        :return: BookStructure with opf path, manifest, spine and metadata
+        """
+        version = get_book_version(epub_path)
+        structure = book_structure_cache.get(epub_path, version)
+        if structure is not None:
+            return structure
+
+        def read_package_document() -> tuple[str, str]:
+            with archive_pool.handle(epub_path, version) as archive:
+                container_xml = archive.read(CONTAINER_PATH).decode('utf-8')
+                opf_path = parse_opf_path(container_xml)
+                return opf_path, archive.read(opf_path).decode('utf-8')
 
-        # Build manifest mapping (id → href)
-        manifest = {item['id']: os.path.join(os.path.dirname(opf_path), item['href'])
-                    for item in soup.find_all('item')}
-        # Build ordered list via spine
-        order = [manifest[itemref['idref']] for itemref in soup.find_all('itemref')]
-        return order
+        opf_path, opf_content = await executors.run_io(read_package_document)
+        manifest, spine, metadata = await executors.run_cpu(parse_opf, opf_content, opf_path)
+        structure = BookStructure(opf_path=opf_path, manifest=manifest, spine=spine, metadata=metadata)
+
+        book_structure_cache.put(epub_path, version, structure)
+        return structure
 
     @staticmethod
-    async def read_epub_file(epub_path: str, internal_path: str) -> str:
-        with zipfile.ZipFile(epub_path, 'r') as z:
-            if internal_path not in z.namelist():
-                raise FileNotFoundError(f"{internal_path} not found in EPUB")
-            return z.read(internal_path)
+    async def read_epub_file(epub_path: str, internal_path: str) -> bytes:
+        return await executors.run_io(read_member, epub_path, internal_path)
 
     @staticmethod
-    async def rewrite_resource_urls(html_content: str, file_path: str, current_xhtml_path: str) -> str:
+    async def read_cached_resource(epub_path: str, internal_path: str,
+                                   version: Optional[BookVersion] = None) -> bytes:
+        """
+        Read a small archive member through resource_cache
+        :param epub_path: path to the epub file
+        :param internal_path: path inside the archive
+        :param version: already known file version (stat is done otherwise)
+        :return: member content
+        """
+        if version is None:
+            version = get_book_version(epub_path)
+        key = (os.path.abspath(epub_path), version, internal_path)
+        content = resource_cache.get(key)
+        if content is None:
+            content = await executors.run_io(read_member, epub_path, internal_path, version)
+            resource_cache.put(key, content, size=len(content))
+        return content
+
+    @staticmethod
+    def iter_epub_file(epub_path: str, internal_path: str, start: int = 0,
+                       length: Optional[int] = None, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Stream an archive member in chunks without loading it into memory.
+        The pooled archive handle stays borrowed until the iterator is exhausted or closed.
+
+        Args:
+            epub_path: Path to the EPUB file
+            internal_path: Path inside the archive
+            start: Offset to start from (cheap only for stored members)
+            length: Number of bytes to send, None for the rest of the member
+            chunk_size: Bytes per chunk, defaults to settings.resource_stream_chunk_size
+        """
+        chunk_size = chunk_size or settings.resource_stream_chunk_size
+        with archive_pool.handle(epub_path) as archive, archive.open(internal_path) as member:
+            if start:
+                member.seek(start)
+            remaining = length
+            while remaining is None or remaining > 0:
+                data = member.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not data:
+                    break
+                if remaining is not None:
+                    remaining -= len(data)
+                yield data
+
+    @staticmethod
+    async def get_member_info(epub_path: str, internal_path: str) -> zipfile.ZipInfo:
+        """
+        Get ZipInfo (size, CRC, compression) of a member without reading it
+        :param epub_path: path to the epub file
+        :param internal_path: path inside the archive
+        :return: ZipInfo of the member
+        """
+        return await executors.run_io(member_info, epub_path, internal_path)
+
+    @staticmethod
+    async def rewrite_resource_urls(html_content: str, file_path: str, current_xhtml_path: str,
+                                    version: Optional[str] = None) -> str:
         """
         Rewrite resource URLs in XHTML content to point to the epub-resource endpoint.
 
@@ -92,85 +248,55 @@ class EPUBData:
             html_content: The XHTML content
             file_path: Path to the EPUB file
             current_xhtml_path: Path of the current XHTML file within the EPUB
+            version: Optional book version tag appended to URLs so resources can be cached as immutable
         """
-        file_name = os.path.basename(file_path)
-
-        # Get the directory of the current XHTML file to resolve relative paths
-        current_dir = os.path.dirname(current_xhtml_path)
-
-        def resolve_path(match):
-            """Resolve relative paths and rewrite to endpoint URL."""
-            attr_name = match.group(1)  # 'href' or 'src'
-            original_path = match.group(2)  # the actual path
-            print("0", match.group(0),"1",  match.group(1), "2",  match.group(2))
-            # Skip external URLs and data URIs
-            if original_path.startswith(('http://', 'https://', 'data:', '//')):
-                return match.group(0)
+        return rewrite_resource_urls(html_content, file_path, current_xhtml_path, version)
 
-            # Resolve relative path
-            if current_dir and not original_path.startswith('/'):
-                # Combine current directory with relative path and normalize
-                resolved = os.path.normpath(os.path.join(current_dir, original_path))
-                # Convert Windows path separators to forward slashes
-                resolved = resolved.replace('\\', '/')
-            else:
-                resolved = original_path.lstrip('/')
-
-            # Create new URL pointing to our endpoint
-            # Use &amp; instead of & for XHTML compliance
-            new_url = f"/book/epub_resource?file_path={quote(file_path)}&amp;resource_path={quote(resolved)}"
-
-            return f'{attr_name}="{new_url}"'
-
-        # Rewrite href and src attributes
-        # Pattern captures: (href|src)=["'](path)["']
-        html_content = re.sub(
-            r'(href|src)=["\']((?!http://|https://|data:|//)[^"\']+)["\']',
-            resolve_path,
-            html_content
-        )
-
-        return html_content
-
-    async def extract_text_from_book(self, epub_path: str) -> str:
+    async def extract_text_from_book(self, epub_path: str, parallel: Optional[bool] = None) -> str:
         """
         Extract all text content from an EPUB file.
         
         Args:
             epub_path: Path to the EPUB file
+            parallel: Fan chapters out to the parallel process pool
+                      (default: settings.extract_parallel)
             
         Returns:
             Plain text content of the book
         """
-        # Read container.xml
-        container_xml = await self.read_epub_file(
-            epub_path=epub_path,
-            internal_path='META-INF/container.xml'
-        )
-        container_xml = container_xml.decode('utf-8')
-        
-        # Get path to content.opf
-        opf_path = await self.get_opf_path(container_xml)
-        
+        if parallel is None:
+            parallel = settings.extract_parallel
+
         # Get ordered XHTML files (chapters)
-        ordered_files = await self.get_spine_order(epub_path, opf_path)
+        structure = await self.get_book_structure(epub_path)
+        ordered_files = structure.spine
         
+        if parallel:
+            # Each task reads and parses a slice of the spine; gather keeps spine order
+            per_task = max(settings.extract_chapters_per_task, 1)
+            slices = await asyncio.gather(*(
+                executors.run_parallel(extract_chapters_text, str(epub_path), ordered_files[start:start + per_task])
+                for start in range(0, len(ordered_files), per_task)
+            ))
+            return '\n\n'.join(text for texts in slices for text in texts)
+
         # Extract text from each chapter
         all_text = []
         for chapter_path in ordered_files:
             chapter_content = await self.read_epub_file(epub_path, chapter_path)
-            chapter_str = chapter_content.decode('utf-8') if isinstance(
-                chapter_content, bytes
-            ) else chapter_content
-            
-            # Parse HTML and extract text
-            soup = BeautifulSoup(chapter_str, 'html.parser')
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text
-            text = soup.get_text(separator='\n', strip=True)
+            text = await executors.run_cpu(extract_chapter_text, chapter_content)
             all_text.append(text)
         
         return '\n\n'.join(all_text)
+
+    async def iter_chapter_texts(self, epub_path: str) -> AsyncIterator[tuple[int, str, str]]:
+        """
+        Yield the text of each chapter in spine order, holding one chapter in memory at a time
+        :param epub_path: path to the epub file
+        :return: async iterator of (chapter index, chapter path, text)
+        """
+        structure = await self.get_book_structure(epub_path)
+        for chapter_index, chapter_path in enumerate(structure.spine):
+            chapter_content = await self.read_epub_file(epub_path, chapter_path)
+            text = await executors.run_cpu(extract_chapter_text, chapter_content)
+            yield chapter_index, chapter_path, text
@@ -0,0 +1,373 @@
+import io
+import os
+import re
+from abc import ABC, abstractmethod
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from settings import settings
+
+
+class ManifestItem(NamedTuple):
+    """One <item> of the OPF manifest, href resolved against the OPF directory."""
+    href: str
+    media_type: str
+
+
+# (manifest, spine, metadata) as returned by parse_opf
+OPFData = tuple[dict[str, ManifestItem], list[str], dict]
+
+
+class ParserBackend(ABC):
+    """
+    Parsing of container.xml, the OPF package document and chapter XHTML.
+    Backends must return identical results; see PARSER_BACKENDS.
+    """
+    name = ""
+
+    @abstractmethod
+    def opf_path(self, container_xml: str) -> str:
+        """
+        Return the path to the OPF file declared in container.xml
+        :param container_xml: content of META-INF/container.xml
+        :return: path to the OPF file inside the archive
+        """
+
+    @abstractmethod
+    def parse_opf(self, opf_content: str, opf_path: str) -> OPFData:
+        """
+        Parse the OPF package document
+        :param opf_content: content of the OPF file
+        :param opf_path: path of the OPF file inside the archive
+        :return: (manifest, spine, metadata)
+        """
+
+    @abstractmethod
+    def chapter_text(self, chapter_str: str) -> str:
+        """
+        Extract plain text of one XHTML chapter, script and style dropped
+        :param chapter_str: chapter markup
+        :return: text with one line per (stripped, non-empty) text node
+        """
+
+
+class SoupParser(ParserBackend):
+    """BeautifulSoup trees: the 'xml' parser for container.xml/OPF, 'html.parser' for chapters."""
+    name = "soup"
+
+    def opf_path(self, container_xml: str) -> str:
+        soup = BeautifulSoup(container_xml, 'xml')
+        rootfile = soup.find('rootfile')
+        if not rootfile or not rootfile.has_attr('full-path'):
+            raise ValueError("OPF path not found in container.xml")
+        return rootfile['full-path']
+
+    def parse_opf(self, opf_content: str, opf_path: str) -> OPFData:
+        soup = BeautifulSoup(opf_content, 'xml')
+        opf_dir = os.path.dirname(opf_path)
+
+        # Build manifest mapping (id → href, media-type)
+        manifest = {
+            item['id']: ManifestItem(
+                href=os.path.join(opf_dir, item['href']),
+                media_type=item.get('media-type', '')
+            )
+            for item in soup.find_all('item')
+        }
+        # Build ordered list via spine
+        spine = [manifest[itemref['idref']].href for itemref in soup.find_all('itemref')]
+
+        metadata = {}
+        metadata_tag = soup.find('metadata')
+        if metadata_tag is not None:
+            def text_of(name: str) -> Optional[str]:
+                tag = metadata_tag.find(name)
+                return tag.get_text(strip=True) if tag else None
+
+            metadata = {
+                "title": text_of('title'),
+                "authors": [tag.get_text(strip=True) for tag in metadata_tag.find_all('creator')],
+                "language": text_of('language'),
+                "identifier": text_of('identifier'),
+                "publisher": text_of('publisher'),
+                "date": text_of('date'),
+            }
+
+        return manifest, spine, metadata
+
+    def chapter_text(self, chapter_str: str) -> str:
+        # Parse HTML and extract text
+        soup = BeautifulSoup(chapter_str, 'html.parser')
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+
+        # Get text
+        return soup.get_text(separator='\n', strip=True)
+
+
+# Dublin Core fields read from <metadata>, besides the creators
+_METADATA_FIELDS = ("title", "language", "identifier", "publisher", "date")
+
+
+def _local_name(element) -> str:
+    return etree.QName(element).localname
+
+
+def _xml_text(element) -> str:
+    """get_text(strip=True) of an lxml element: stripped text nodes, comments and PIs skipped."""
+    parts = []
+
+    def walk(node) -> None:
+        if node.text and isinstance(node.tag, str):
+            parts.append(node.text.strip())
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail.strip())
+
+    walk(element)
+    return "".join(parts)
+
+
+def _iterparse(content: str):
+    # The content is already decoded, whatever encoding the declaration names
+    return etree.iterparse(
+        io.BytesIO(content.encode('utf-8')), events=("start", "end"),
+        encoding='utf-8', recover=True, huge_tree=True
+    )
+
+
+# Void elements never get an end tag, so they are not pushed on the open element stack
+_VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer',
+})
+# Text inside these is not chapter text (BeautifulSoup drops template strings from get_text too,
+# except CDATA sections)
+_SKIPPED_ELEMENTS = frozenset({'script', 'style', 'template'})
+_NUMERIC_REFERENCE_RE = {10: re.compile("^([0-9]+)(.*)"), 16: re.compile("^([0-9a-f]+)(.*)")}
+
+
+def _numeric_reference(number: int) -> str:
+    """Character of a numeric reference, resolved the way BeautifulSoup does."""
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= number <= 0x9F:
+        # Windows-1252 bytes written as references
+        try:
+            return bytes([number]).decode('cp1252')
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Streaming text extractor: collects text nodes as html.parser reports them.
+    Text nodes are delimited exactly where BeautifulSoup ends its strings
+    (tags, comments, declarations, processing instructions), so the output
+    equals get_text(separator='\\n', strip=True) without building a tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.lines: list[str] = []
+        self._data: list[str] = []
+        self._open: list[str] = []
+        # Void elements opened as <br>, whose explicit </br> is ignored
+        self._closed_voids: list[str] = []
+        self._inside = dict.fromkeys(_SKIPPED_ELEMENTS, 0)
+
+    def _flush(self, cdata: bool = False) -> None:
+        if self._data:
+            text = "".join(self._data).strip()
+            self._data = []
+            inside = self._inside
+            if text and not (inside['script'] or inside['style'] or (inside['template'] and not cdata)):
+                self.lines.append(text)
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self._flush()
+        if tag in _VOID_ELEMENTS:
+            self._closed_voids.append(tag)
+            return
+        self._open.append(tag)
+        if tag in _SKIPPED_ELEMENTS:
+            self._inside[tag] += 1
+
+    def handle_startendtag(self, tag, attrs) -> None:
+        self._flush()
+
+    def handle_endtag(self, tag) -> None:
+        if tag in self._closed_voids:
+            self._closed_voids.remove(tag)
+            return
+        self._flush()
+        # Like BeautifulSoup, an end tag closes everything opened after its start tag
+        if tag not in self._open:
+            return
+        while True:
+            name = self._open.pop()
+            if name in _SKIPPED_ELEMENTS:
+                self._inside[name] -= 1
+            if name == tag:
+                break
+
+    def handle_data(self, data) -> None:
+        self._data.append(data)
+
+    def handle_entityref(self, name) -> None:
+        # Unknown names are literal text, as in BeautifulSoup
+        self._data.append(html5.get(f"{name};", f"&{name}"))
+
+    def handle_charref(self, name) -> None:
+        base = 16 if name[:1] in ('x', 'X') else 10
+        digits = name[1:] if base == 16 else name
+        extra = ""
+        try:
+            number = int(digits, base)
+        except ValueError:
+            # A reference without ";" followed by text: the leading digits are the reference
+            match = _NUMERIC_REFERENCE_RE[base].search(digits)
+            if match is None:
+                self._data.append(digits)
+                return
+            number, extra = int(match.group(1), base), match.group(2)
+        self._data.append(_numeric_reference(number) + extra)
+
+    def handle_comment(self, data) -> None:
+        self._flush()
+
+    def handle_decl(self, decl) -> None:
+        self._flush()
+
+    def handle_pi(self, data) -> None:
+        self._flush()
+
+    def unknown_decl(self, data) -> None:
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            # CDATA sections are text nodes of their own
+            self._data.append(data[len("CDATA["):])
+            self._flush(cdata=True)
+
+
+class FastParser(ParserBackend):
+    """
+    lxml iterparse for container.xml/OPF and a streaming html.parser text
+    extractor for chapters; no object trees are built. Any parse error is
+    retried with the fallback backend.
+    """
+    name = "fast"
+
+    def __init__(self, fallback: ParserBackend):
+        self.fallback = fallback
+
+    def opf_path(self, container_xml: str) -> str:
+        try:
+            for event, element in _iterparse(container_xml):
+                if event == "start" and _local_name(element) == 'rootfile':
+                    if 'full-path' not in element.attrib:
+                        break
+                    return element.attrib['full-path']
+        except etree.LxmlError:
+            return self.fallback.opf_path(container_xml)
+        raise ValueError("OPF path not found in container.xml")
+
+    def parse_opf(self, opf_content: str, opf_path: str) -> OPFData:
+        try:
+            return self._parse_opf(opf_content, opf_path)
+        except (etree.LxmlError, KeyError, ValueError):
+            return self.fallback.parse_opf(opf_content, opf_path)
+
+    @staticmethod
+    def _parse_opf(opf_content: str, opf_path: str) -> OPFData:
+        opf_dir = os.path.dirname(opf_path)
+        manifest = {}
+        idrefs = []
+        metadata = {}
+        metadata_element = None
+        # First element of each field and every creator, in start tag order like find()/find_all()
+        fields = {}
+        creators = []
+        depth = 0  # inside the first <metadata> when > 0
+
+        for event, element in _iterparse(opf_content):
+            name = _local_name(element)
+            if event == "start":
+                if depth:
+                    depth += 1
+                    if name == 'creator':
+                        creators.append(element)
+                    elif name in _METADATA_FIELDS:
+                        fields.setdefault(name, element)
+                elif metadata_element is None and name == 'metadata':
+                    metadata_element = element
+                    depth = 1
+                continue
+
+            if name == 'item':
+                manifest[element.attrib['id']] = ManifestItem(
+                    href=os.path.join(opf_dir, element.attrib['href']),
+                    media_type=element.attrib.get('media-type', '')
+                )
+            elif name == 'itemref':
+                idrefs.append(element.attrib['idref'])
+            if depth:
+                depth -= 1
+                # <metadata> children are kept until it ends
+                if depth:
+                    continue
+                text_of = {field: _xml_text(tag) for field, tag in fields.items()}
+                metadata = {
+                    "title": text_of.get('title'),
+                    "authors": [_xml_text(tag) for tag in creators],
+                    "language": text_of.get('language'),
+                    "identifier": text_of.get('identifier'),
+                    "publisher": text_of.get('publisher'),
+                    "date": text_of.get('date'),
+                }
+            # Everything else is done with once it ends
+            element.clear()
+
+        spine = [manifest[idref].href for idref in idrefs]
+        return manifest, spine, metadata
+
+    def chapter_text(self, chapter_str: str) -> str:
+        extractor = _TextExtractor()
+        try:
+            extractor.feed(chapter_str)
+            extractor.close()
+        except AssertionError:
+            # html.parser gives up on some broken declarations
+            return self.fallback.chapter_text(chapter_str)
+        extractor._flush()
+        return "\n".join(extractor.lines)
+
+
+_soup_parser = SoupParser()
+
+# Available parser backends by settings.parser_backend name
+PARSER_BACKENDS: dict[str, ParserBackend] = {
+    "fast": FastParser(fallback=_soup_parser),
+    "soup": _soup_parser,
+}
+
+
+def get_parser(name: Optional[str] = None) -> ParserBackend:
+    """
+    Return a parser backend
+    :param name: backend name, settings.parser_backend if None
+    :return: ParserBackend
+    """
+    name = name or settings.parser_backend
+    backend = PARSER_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unsupported parser backend: '{name}'. Use one of: {', '.join(PARSER_BACKENDS)}")
+    return backend
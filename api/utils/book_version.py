@@ -0,0 +1,44 @@
+import hashlib
+import os
+from typing import NamedTuple
+
+
+class BookVersion(NamedTuple):
+    """
+    Identifies one concrete version of a stored book file.
+
+    Attributes:
+        mtime_ns (int): file modification time in nanoseconds
+        size (int): file size in bytes
+    """
+    mtime_ns: int
+    size: int
+
+    @property
+    def tag(self) -> str:
+        """Short hex string for use in cache keys and ETags."""
+        return f"{self.mtime_ns:x}-{self.size:x}"
+
+
+def get_book_version(epub_path: str | os.PathLike) -> BookVersion:
+    """
+    Stat the book file and return its current version
+    :param epub_path: path to the epub file
+    :return: BookVersion of the file
+    """
+    stat = os.stat(epub_path)
+    return BookVersion(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+
+def file_sha256(path: str | os.PathLike, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Hash the content of a file
+    :param path: path to the file
+    :param chunk_size: bytes read at once
+    :return: hex sha256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
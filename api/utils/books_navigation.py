@@ -3,15 +3,8 @@ import re
 from urllib.parse import quote
 
 
-def add_navigation_buttons(html_content: str, filename: str, current_index: int, total_chapters: int) -> str:
-    """Add Previous and Next navigation buttons to the top and bottom of the chapter."""
-
-    # Determine if prev/next buttons should be enabled
-    has_prev = current_index > 0
-    has_next = current_index < total_chapters - 1
-
-    # Create the navigation bar HTML
-    nav_style = """
+# Built once: identical for every chapter
+NAV_STYLE = """
     <style>
         .chapter-nav {
             display: flex;
@@ -49,44 +42,89 @@ def add_navigation_buttons(html_content: str, filename: str, current_index: int,
     </style>
     """
 
-    prev_url = f"/book/chapter?filename={quote(filename)}&amp;chapter_index={current_index - 1}" if has_prev else "#"
-    next_url = f"/book/chapter?filename={quote(filename)}&amp;chapter_index={current_index + 1}" if has_next else "#"
-
-    # XHTML requires disabled="disabled" instead of just disabled
-    prev_disabled = '' if has_prev else ' disabled="disabled"'
-    next_disabled = '' if has_next else ' disabled="disabled"'
-
-    nav_html = f"""
+NAV_TEMPLATE = """
     <div class="chapter-nav">
         <button onclick="window.location.href='{prev_url}'"{prev_disabled}>
             ← Previous
         </button>
-        <span class="chapter-info">Chapter {current_index + 1} of {total_chapters}</span>
+        <span class="chapter-info">Chapter {current} of {total_chapters}</span>
         <button onclick="window.location.href='{next_url}'"{next_disabled}>
             Next →
         </button>
     </div>
     """
 
-    # Try to insert after opening body tag, or prepend to content
-    if '<body' in html_content.lower():
-        # Insert style in head and nav after body opening tag
-        if '<head' in html_content.lower():
-            html_content = html_content.replace('</head>', f'{nav_style}</head>', 1)
-        else:
-            # No head tag, add style before body
-            html_content = html_content.replace('<body', f'{nav_style}<body', 1)
-
-        # Add navigation after body tag
-        body_match = re.search(r'<body[^>]*>', html_content, re.IGNORECASE)
-        if body_match:
-            insert_pos = body_match.end()
-            html_content = html_content[:insert_pos] + nav_html + html_content[insert_pos:]
-
-        # Add navigation before closing body tag
-        html_content = html_content.replace('</body>', f'{nav_html}</body>', 1)
-    else:
+HEAD_RE = re.compile(r'<head', re.IGNORECASE)
+BODY_RE = re.compile(r'<body', re.IGNORECASE)
+BODY_OPEN_RE = re.compile(r'<body[^>]*>', re.IGNORECASE)
+
+
+def build_nav_html(filename: str, current_index: int, total_chapters: int) -> str:
+    """Render the navigation bar for a chapter."""
+
+    # Determine if prev/next buttons should be enabled
+    has_prev = current_index > 0
+    has_next = current_index < total_chapters - 1
+
+    prev_url = f"/book/chapter?filename={quote(filename)}&amp;chapter_index={current_index - 1}" if has_prev else "#"
+    next_url = f"/book/chapter?filename={quote(filename)}&amp;chapter_index={current_index + 1}" if has_next else "#"
+
+    # XHTML requires disabled="disabled" instead of just disabled
+    prev_disabled = '' if has_prev else ' disabled="disabled"'
+    next_disabled = '' if has_next else ' disabled="disabled"'
+
+    return NAV_TEMPLATE.format(
+        prev_url=prev_url,
+        prev_disabled=prev_disabled,
+        next_url=next_url,
+        next_disabled=next_disabled,
+        current=current_index + 1,
+        total_chapters=total_chapters
+    )
+
+
+def navigation_segments(html_content: str, filename: str, current_index: int, total_chapters: int) -> list[str]:
+    """
+    Add Previous and Next navigation buttons to the top and bottom of the chapter.
+    Insertion points are located once on the original document and the page is
+    returned as a list of segments, so the chapter text is never rebuilt.
+    """
+    nav_html = build_nav_html(filename, current_index, total_chapters)
+
+    if not BODY_RE.search(html_content):
         # No body tag found, just prepend and append
-        html_content = nav_style + nav_html + html_content + nav_html
+        return [NAV_STYLE, nav_html, html_content, nav_html]
+
+    # (position, order, segment): order keeps the nav after <body ...> ahead of
+    # the style when both land on the same position
+    inserts = []
+
+    # Style goes in head, or before body when there is no head
+    style_pos = html_content.find('</head>') if HEAD_RE.search(html_content) else html_content.find('<body')
+    if style_pos != -1:
+        inserts.append((style_pos, 1, NAV_STYLE))
+
+    # Navigation after body tag
+    body_match = BODY_OPEN_RE.search(html_content)
+    if body_match:
+        inserts.append((body_match.end(), 0, nav_html))
 
-    return html_content
\ No newline at end of file
+    # Navigation before closing body tag
+    body_close_pos = html_content.find('</body>')
+    if body_close_pos != -1:
+        inserts.append((body_close_pos, 2, nav_html))
+
+    inserts.sort()
+    segments = []
+    last = 0
+    for pos, _, segment in inserts:
+        segments.append(html_content[last:pos])
+        segments.append(segment)
+        last = pos
+    segments.append(html_content[last:])
+    return segments
+
+
+def add_navigation_buttons(html_content: str, filename: str, current_index: int, total_chapters: int) -> str:
+    """Add Previous and Next navigation buttons to the top and bottom of the chapter."""
+    return ''.join(navigation_segments(html_content, filename, current_index, total_chapters))
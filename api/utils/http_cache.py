@@ -0,0 +1,64 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional
+
+from api.utils.book_version import BookVersion
+
+
+# Resources addressed by a versioned URL never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unversioned URLs may be cached but have to be revalidated with the ETag
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def make_etag(version: BookVersion, *parts: int | str) -> str:
+    """
+    Build a strong ETag for content derived from a book version
+    :param version: version of the epub file
+    :param parts: extra discriminators, ints are rendered as 8-digit hex (e.g. member CRC)
+    :return: quoted ETag value
+    """
+    suffix = "".join(f"-{p:08x}" if isinstance(p, int) else f"-{p}" for p in parts)
+    return f'"{version.tag}{suffix}"'
+
+
+def last_modified(version: BookVersion) -> str:
+    """
+    Format the file mtime as an HTTP date
+    :param version: version of the epub file
+    :return: value for the Last-Modified header
+    """
+    return formatdate(version.mtime_ns / 1e9, usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison is what If-None-Match uses
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, version: Optional[BookVersion] = None) -> bool:
+    """
+    Evaluate conditional request headers
+    :param headers: request headers
+    :param etag: current ETag of the representation
+    :param version: book version used for If-Modified-Since (skipped if None)
+    :return: True if a 304 Not Modified response can be sent
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and version is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since is None:
+            return False
+        return int(version.mtime_ns // 1_000_000_000) <= int(since.timestamp())
+
+    return False
@@ -0,0 +1,44 @@
+from typing import Optional
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the resource size."""
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single byte range of a Range header
+    :param range_header: value of the Range header
+    :param size: full size of the resource
+    :return: (start, end) inclusive, or None when the whole resource should be sent
+    """
+    if not range_header:
+        return None
+
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        # Other units and multipart ranges are not supported, send everything
+        return None
+
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable(range_header)
+            start = max(size - suffix, 0)
+            end = size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping shared by the in-process caches.
+
+    Attributes:
+        max_entries (int): maximum number of entries kept before the least
+            recently used one is evicted
+        max_bytes (int): optional budget for the sum of entry sizes passed to put()
+    """
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+        self._sizes: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int = 0) -> None:
+        """
+        Store a value
+        :param key: cache key
+        :param value: value to store
+        :param size: size of the value in bytes, counted against max_bytes
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything and still not fit
+            return
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size
+            self.total_bytes += size
+            while len(self._data) > self.max_entries or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                evicted, _ = self._data.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(evicted, 0)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, default)
+
+    def pop_matching(self, predicate) -> int:
+        """
+        Remove every entry whose key satisfies the predicate
+        :param predicate: callable taking a key
+        :return: number of removed entries
+        """
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+                self.total_bytes -= self._sizes.pop(key, 0)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+        :return: dict with size, hits, misses and evictions
+        """
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,105 @@
+import os
+import re
+from functools import lru_cache
+from typing import Iterator, Optional
+from urllib.parse import quote, unquote
+
+
+# Pattern captures: (href|src)=["'](path)["'], external URLs and data URIs are skipped
+RESOURCE_ATTR_RE = re.compile(r'(href|src)=["\']((?!http://|https://|data:|//)[^"\']+)["\']')
+
+
+@lru_cache(maxsize=16384)
+def resolve_resource_path(current_dir: str, original_path: str) -> str:
+    """
+    Resolve a chapter-relative path to a quoted path inside the archive
+    :param current_dir: directory of the current XHTML file within the EPUB
+    :param original_path: value of the href/src attribute
+    :return: URL-quoted archive path
+    """
+    if current_dir and not original_path.startswith('/'):
+        # Combine current directory with relative path and normalize
+        resolved = os.path.normpath(os.path.join(current_dir, original_path))
+        # Convert Windows path separators to forward slashes
+        resolved = resolved.replace('\\', '/')
+    else:
+        resolved = original_path.lstrip('/')
+    return quote(resolved)
+
+
+def _find_resource_attrs(html_content: str) -> Iterator[re.Match]:
+    """
+    Yield the same matches as RESOURCE_ATTR_RE.finditer, but jump between
+    'href='/'src=' occurrences with str.find instead of trying the regex at
+    every position of the document.
+    """
+    pos = 0
+    next_href = html_content.find('href=')
+    next_src = html_content.find('src=')
+    while True:
+        if next_href != -1 and next_href < pos:
+            next_href = html_content.find('href=', pos)
+        if next_src != -1 and next_src < pos:
+            next_src = html_content.find('src=', pos)
+        if next_href == -1 and next_src == -1:
+            return
+
+        if next_src == -1 or (next_href != -1 and next_href < next_src):
+            start = next_href
+        else:
+            start = next_src
+
+        match = RESOURCE_ATTR_RE.match(html_content, start)
+        if match is None:
+            pos = start + 1
+            continue
+        yield match
+        pos = match.end()
+
+
+def rewrite_resource_urls(html_content: str, file_path: str, current_xhtml_path: str,
+                          version: Optional[str] = None) -> str:
+    """
+    Rewrite href/src attributes to point to the epub-resource endpoint in a single pass
+    :param html_content: the XHTML content
+    :param file_path: path to the EPUB file
+    :param current_xhtml_path: path of the current XHTML file within the EPUB
+    :param version: optional book version tag appended to every URL
+    :return: rewritten XHTML
+    """
+    current_dir = os.path.dirname(current_xhtml_path)
+    # Everything but the resource path is the same for the whole chapter.
+    # Use &amp; instead of & for XHTML compliance
+    prefix = f'="/book/epub_resource?file_path={quote(file_path)}&amp;resource_path='
+    suffix = f'&amp;v={version}"' if version else '"'
+
+    segments = []
+    last = 0
+    for match in _find_resource_attrs(html_content):
+        segments.append(html_content[last:match.start()])
+        segments.append(match[1])
+        segments.append(prefix)
+        segments.append(resolve_resource_path(current_dir, match[2]))
+        segments.append(suffix)
+        last = match.end()
+
+    if not segments:
+        return html_content
+    segments.append(html_content[last:])
+    return ''.join(segments)
+
+
+def referenced_resources(html_content: str, current_xhtml_path: str) -> list[str]:
+    """
+    List archive paths referenced by href/src attributes of a chapter
+    :param html_content: the XHTML content
+    :param current_xhtml_path: path of the current XHTML file within the EPUB
+    :return: unique archive paths in document order, fragments stripped
+    """
+    current_dir = os.path.dirname(current_xhtml_path)
+    paths = {}
+    for match in _find_resource_attrs(html_content):
+        path = unquote(resolve_resource_path(current_dir, match[2])).partition('#')[0]
+        if path:
+            paths[path] = None
+    return list(paths)
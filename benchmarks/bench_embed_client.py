@@ -0,0 +1,97 @@
+"""
+Throughput benchmark for AsyncOllamaEmbedClient.
+
+Embeds a fixed number of chunks against a simulated Ollama /api/embed endpoint
+(an in-process httpx transport) for several batch size / in-flight combinations.
+The fake server handles `--server-parallel` requests at a time and each request
+costs a fixed overhead plus a per-text cost, which is roughly how a local Ollama
+behaves. Point --base-url at a real server to measure that instead.
+
+    uv run python -m benchmarks.bench_embed_client [--chunks 2000] [--base-url http://localhost:11434]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+import httpx
+
+from core.ollama_embed_client import AsyncOllamaEmbedClient
+
+
+CONFIGURATIONS = [
+    # (batch_size, max_in_flight)
+    (1, 1),
+    (16, 1),
+    (64, 1),
+    (16, 4),
+    (64, 4),
+    (64, 8),
+]
+
+
+class FakeOllamaTransport(httpx.AsyncBaseTransport):
+    """Answers /api/embed with deterministic vectors after a simulated delay."""
+
+    def __init__(self, parallel: int, overhead: float, per_text: float, dim: int = 768):
+        self.semaphore = asyncio.Semaphore(parallel)
+        self.overhead = overhead
+        self.per_text = per_text
+        self.dim = dim
+
+    def vector(self, text: str) -> list[float]:
+        seed = hashlib.sha256(text.encode()).digest()
+        return [seed[i % len(seed)] / 255 for i in range(self.dim)]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        texts = json.loads(await request.aread())["input"]
+        async with self.semaphore:
+            await asyncio.sleep(self.overhead + self.per_text * len(texts))
+        return httpx.Response(200, json={"embeddings": [self.vector(text) for text in texts]})
+
+
+async def measure(args, batch_size: int, max_in_flight: int) -> dict:
+    transport = None
+    if args.base_url is None:
+        transport = FakeOllamaTransport(args.server_parallel, args.overhead / 1000, args.per_text / 1000)
+    client = AsyncOllamaEmbedClient(
+        model_name=args.model,
+        base_url=args.base_url or "http://fake-ollama",
+        batch_size=batch_size,
+        max_in_flight=max_in_flight,
+        transport=transport
+    )
+    texts = [f"chunk {i} " + "lorem ipsum " * 80 for i in range(args.chunks)]
+    started = time.perf_counter()
+    vectors = await client.embed(texts)
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    assert len(vectors) == len(texts)
+    return {
+        "batch_size": batch_size,
+        "max_in_flight": max_in_flight,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(len(texts) / elapsed, 1),
+        "requests": client.requests,
+    }
+
+
+async def main(args) -> None:
+    baseline = None
+    for batch_size, max_in_flight in CONFIGURATIONS:
+        result = await measure(args, batch_size, max_in_flight)
+        baseline = baseline or result["chunks_per_second"]
+        result["speedup"] = round(result["chunks_per_second"] / baseline, 1)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--model", default="embeddinggemma")
+    parser.add_argument("--base-url", default=None, help="Real Ollama server (default: simulated)")
+    parser.add_argument("--server-parallel", type=int, default=4, help="Simulated server concurrency")
+    parser.add_argument("--overhead", type=float, default=15.0, help="Simulated ms per request")
+    parser.add_argument("--per-text", type=float, default=1.0, help="Simulated ms per text")
+    asyncio.run(main(parser.parse_args()))
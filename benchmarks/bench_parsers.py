@@ -0,0 +1,128 @@
+"""
+Benchmark of the parser backends (settings.parser_backend).
+
+Reads container.xml, the OPF and every spine chapter of every book in
+books_stored, checks that all backends return identical results and prints
+the parse time per chapter for each backend, plus the slowest chapters.
+
+    uv run python -m benchmarks.bench_parsers [--repeat 5] [--slowest 10] [--per-chapter]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from settings import settings
+from api.services.book_structure import CONTAINER_PATH
+from api.services.epub import EPUBData
+from api.services.parsers import PARSER_BACKENDS, ParserBackend
+
+
+async def load_books() -> list[dict]:
+    epub_service = EPUBData()
+    books = []
+    for book in sorted(epub_service.get_books(), key=lambda b: b["filename"]):
+        container_xml = (await epub_service.read_epub_file(book["path"], CONTAINER_PATH)).decode('utf-8')
+        structure = await epub_service.get_book_structure(book["path"])
+        opf_content = (await epub_service.read_epub_file(book["path"], structure.opf_path)).decode('utf-8')
+        chapters = [
+            (chapter_path, (await epub_service.read_epub_file(book["path"], chapter_path)).decode('utf-8'))
+            for chapter_path in structure.spine
+        ]
+        books.append({
+            "filename": book["filename"],
+            "container_xml": container_xml,
+            "opf_path": structure.opf_path,
+            "opf_content": opf_content,
+            "chapters": chapters,
+        })
+    return books
+
+
+def best_of(func, repeat: int) -> float:
+    """Fastest of `repeat` runs in seconds, the least disturbed by the rest of the machine."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_identical(books: list[dict]) -> None:
+    reference_name, reference = next(iter(PARSER_BACKENDS.items()))
+    for name, backend in PARSER_BACKENDS.items():
+        if backend is reference:
+            continue
+        for book in books:
+            assert backend.opf_path(book["container_xml"]) == reference.opf_path(book["container_xml"]), \
+                f"{name}: OPF path differs from {reference_name} for {book['filename']}"
+            assert (backend.parse_opf(book["opf_content"], book["opf_path"])
+                    == reference.parse_opf(book["opf_content"], book["opf_path"])), \
+                f"{name}: OPF differs from {reference_name} for {book['filename']}"
+            for chapter_path, content in book["chapters"]:
+                assert backend.chapter_text(content) == reference.chapter_text(content), \
+                    f"{name}: text differs from {reference_name} for {book['filename']}:{chapter_path}"
+    print(f"output identical for every backend ({', '.join(PARSER_BACKENDS)})")
+
+
+def time_backend(backend: ParserBackend, books: list[dict], repeat: int) -> dict:
+    opf = [best_of(lambda book=book: backend.parse_opf(book["opf_content"], book["opf_path"]), repeat)
+           for book in books]
+    chapters = {
+        (book["filename"], chapter_path): best_of(lambda content=content: backend.chapter_text(content), repeat)
+        for book in books
+        for chapter_path, content in book["chapters"]
+    }
+    return {"opf": opf, "chapters": chapters}
+
+
+def summary(name: str, timings: dict) -> str:
+    per_chapter = sorted(timings["chapters"].values())
+    p95 = per_chapter[min(len(per_chapter) - 1, int(len(per_chapter) * 0.95))]
+    return (f"{name:>5}: chapters mean {statistics.mean(per_chapter) * 1e3:7.2f} ms, "
+            f"median {statistics.median(per_chapter) * 1e3:7.2f} ms, p95 {p95 * 1e3:7.2f} ms, "
+            f"max {per_chapter[-1] * 1e3:7.2f} ms, total {sum(per_chapter) * 1e3:8.1f} ms | "
+            f"OPF mean {statistics.mean(timings['opf']) * 1e3:6.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per chapter, the fastest one counts")
+    parser.add_argument("--slowest", type=int, default=10, help="slowest chapters listed")
+    parser.add_argument("--per-chapter", action="store_true", help="list every chapter")
+    args = parser.parse_args()
+
+    books = asyncio.run(load_books())
+    chapters = [(book["filename"], chapter_path, content)
+                for book in books for chapter_path, content in book["chapters"]]
+    total_bytes = sum(len(content) for _, _, content in chapters)
+    print(f"{len(books)} books, {len(chapters)} chapters, {total_bytes / 1e6:.1f} MB of XHTML "
+          f"from {settings.books_path}")
+    check_identical(books)
+
+    timings = {name: time_backend(backend, books, args.repeat) for name, backend in PARSER_BACKENDS.items()}
+    print()
+    for name, result in timings.items():
+        print(summary(name, result))
+    baseline = sum(timings["soup"]["chapters"].values())
+    for name, result in timings.items():
+        if name != "soup":
+            print(f"{name} chapter speedup over soup: {baseline / sum(result['chapters'].values()):.1f}x")
+
+    sizes = {(filename, chapter_path): len(content) for filename, chapter_path, content in chapters}
+    keys = sorted(sizes, key=lambda key: timings["soup"]["chapters"][key], reverse=True)
+    if not args.per_chapter:
+        keys = keys[:args.slowest]
+        print(f"\nslowest {len(keys)} chapters (ms per parse)")
+    else:
+        print("\nevery chapter (ms per parse)")
+    print(f"{'KB':>7} " + " ".join(f"{name:>8}" for name in timings) + "  chapter")
+    for key in keys:
+        print(f"{sizes[key] / 1e3:7.1f} "
+              + " ".join(f"{result['chapters'][key] * 1e3:8.2f}" for result in timings.values())
+              + f"  {key[0]}:{key[1]}")
+
+
+if __name__ == "__main__":
+    main()
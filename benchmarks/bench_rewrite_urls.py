@@ -0,0 +1,120 @@
+"""
+Micro-benchmark of the chapter resource URL rewriter.
+
+Runs the previous callback-per-match implementation and the current one over
+every chapter of every book in books_stored, checks that the output is
+identical and prints the timings.
+
+    uv run python -m benchmarks.bench_rewrite_urls [--repeat 20]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import re
+import time
+from urllib.parse import quote
+
+from settings import settings
+from api.services.epub import EPUBData
+from api.utils.resource_urls import rewrite_resource_urls, resolve_resource_path
+
+
+def legacy_rewrite_resource_urls(html_content: str, file_path: str, current_xhtml_path: str,
+                                 version: str | None = None) -> str:
+    """Rewriter as it was before the precompiled version (including its debug print)."""
+    version_param = f"&amp;v={version}" if version else ""
+    current_dir = os.path.dirname(current_xhtml_path)
+
+    def resolve_path(match):
+        attr_name = match.group(1)
+        original_path = match.group(2)
+        print("0", match.group(0), "1", match.group(1), "2", match.group(2))
+        if original_path.startswith(('http://', 'https://', 'data:', '//')):
+            return match.group(0)
+        if current_dir and not original_path.startswith('/'):
+            resolved = os.path.normpath(os.path.join(current_dir, original_path))
+            resolved = resolved.replace('\\', '/')
+        else:
+            resolved = original_path.lstrip('/')
+        new_url = (f"/book/epub_resource?file_path={quote(file_path)}"
+                   f"&amp;resource_path={quote(resolved)}{version_param}")
+        return f'{attr_name}="{new_url}"'
+
+    return re.sub(
+        r'(href|src)=["\']((?!http://|https://|data:|//)[^"\']+)["\']',
+        resolve_path,
+        html_content
+    )
+
+
+async def load_chapters() -> list[tuple[str, str, str]]:
+    epub_service = EPUBData()
+    chapters = []
+    for book in sorted(epub_service.get_books(), key=lambda b: b["filename"]):
+        structure = await epub_service.get_book_structure(book["path"])
+        for chapter_path in structure.spine:
+            content = await epub_service.read_epub_file(book["path"], chapter_path)
+            chapters.append((book["path"], chapter_path, content.decode('utf-8')))
+    return chapters
+
+
+def footnote_heavy_chapter(links: int = 500) -> tuple[str, str, str]:
+    """Synthetic chapter with many footnote links, the worst case for the rewriter."""
+    paragraphs = "\n".join(
+        f'<p>Text {i}<a href="../Text/notes.xhtml#note{i}" id="ref{i}"><sup>{i}</sup></a></p>'
+        for i in range(links)
+    )
+    content = (f'<html><head><link href="../Styles/style.css" rel="stylesheet"/></head>'
+               f'<body>{paragraphs}</body></html>')
+    return "books_stored/synthetic.epub", "OEBPS/Text/chapter.xhtml", content
+
+
+def timed(func, chapters, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for file_path, chapter_path, content in chapters:
+            func(content, file_path, chapter_path, "v1")
+    return time.perf_counter() - start
+
+
+def report(name: str, chapters: list[tuple[str, str, str]], repeat: int) -> None:
+    print(f"\n== {name}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for file_path, chapter_path, content in chapters:
+            expected = legacy_rewrite_resource_urls(content, file_path, chapter_path, "v1")
+            actual = rewrite_resource_urls(content, file_path, chapter_path, "v1")
+            assert actual == expected, f"output differs for {file_path}:{chapter_path}"
+    print("output identical on every chapter")
+
+    # Legacy stdout goes to a buffer so the terminal does not dominate the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = timed(legacy_rewrite_resource_urls, chapters, repeat)
+    resolve_resource_path.cache_clear()
+    current = timed(rewrite_resource_urls, chapters, repeat)
+
+    runs = len(chapters) * repeat
+    print(f"legacy : {legacy * 1e3:8.1f} ms total, {legacy / runs * 1e6:7.1f} us/chapter")
+    print(f"current: {current * 1e3:8.1f} ms total, {current / runs * 1e6:7.1f} us/chapter")
+    print(f"speedup: {legacy / current:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    chapters = [
+        (str(file_path), chapter_path, content)
+        for file_path, chapter_path, content in asyncio.run(load_chapters())
+    ]
+    total_bytes = sum(len(content) for _, _, content in chapters)
+    print(f"{len(chapters)} chapters, {total_bytes / 1e6:.1f} MB of XHTML from {settings.books_path}")
+    report("corpus", chapters, args.repeat)
+    report("footnote-heavy chapter (500 links)", [footnote_heavy_chapter()], args.repeat * 10)
+
+
+if __name__ == "__main__":
+    main()
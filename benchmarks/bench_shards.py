@@ -0,0 +1,114 @@
+"""
+Per-book query latency against library size for each VectorStore shard mode.
+
+Synthetic books (random unit vectors, no Ollama needed) are added to a fresh
+store per mode in steps up to the largest library size; after each step
+`--queries` per-book searches (book_id filter, k=4) are timed, the way
+/book/ask queries the store.
+
+    uv run python -m benchmarks.bench_shards [--sizes 10 50 200] [--chunks 300] [--dim 384]
+"""
+import argparse
+import json
+import math
+import random
+import tempfile
+import time
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.vector_store import VectorStore
+
+
+MODES = ["none", "bucket", "book"]
+
+
+def random_vector(rng: random.Random, dim: int) -> list[float]:
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+class RandomEmbeddings(Embeddings):
+    """Only needed to build the LangChain wrapper, queries pass vectors directly."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.rng = random.Random(0)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [random_vector(self.rng, self.dim) for _ in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return random_vector(self.rng, self.dim)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def add_books(store: VectorStore, first: int, last: int, chunks: int, dim: int) -> None:
+    rng = random.Random(first)
+    for book in range(first, last):
+        book_id = f"book_{book:05d}"
+        documents = [Document(page_content=f"{book_id} chunk {i}", metadata={"book_id": book_id})
+                     for i in range(chunks)]
+        ids = [f"{book_id}-{i}" for i in range(chunks)]
+        vectors = [random_vector(rng, dim) for _ in range(chunks)]
+        for start in range(0, chunks, 1000):
+            store.upsert_embeddings(documents[start:start + 1000], ids[start:start + 1000], vectors[start:start + 1000])
+
+
+def run_mode(mode: str, args) -> list[dict]:
+    results = []
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = VectorStore(
+            collection_name="bench",
+            persist_directory=directory,
+            embedding_function=RandomEmbeddings(args.dim),
+            shard_mode=mode,
+            shard_buckets=args.buckets
+        )
+        books = 0
+        for size in sorted(args.sizes):
+            add_books(store, books, size, args.chunks, args.dim)
+            books = size
+            # Warm up the collections touched by the queries
+            store.similarity_search_by_vector(random_vector(rng, args.dim), k=4, filter={"book_id": "book_00000"})
+            latencies = []
+            for _ in range(args.queries):
+                book_id = f"book_{rng.randrange(size):05d}"
+                vector = random_vector(rng, args.dim)
+                started = time.perf_counter()
+                docs = store.similarity_search_by_vector(vector, k=4, filter={"book_id": book_id})
+                latencies.append((time.perf_counter() - started) * 1000)
+                assert all(doc.metadata["book_id"] == book_id for doc in docs)
+            results.append({
+                "mode": mode,
+                "books": size,
+                "chunks": size * args.chunks,
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+            })
+            print(json.dumps(results[-1]), flush=True)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="Library sizes in books")
+    parser.add_argument("--chunks", type=int, default=300, help="Chunks per book")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--buckets", type=int, default=16, help="Collections in bucket mode")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per size")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+    for mode in args.modes:
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
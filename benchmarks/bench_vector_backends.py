@@ -0,0 +1,96 @@
+"""
+Recall and latency of the NumPy vector backend (float16 and int8) against Chroma.
+
+Synthetic books of clustered random vectors are written to each backend; the
+queries are perturbed copies of stored chunks. Recall@k is measured against an
+exact float32 search, latency is timed for per-book searches (book_id filter),
+the way /book/ask queries the store.
+
+    uv run python -m benchmarks.bench_vector_backends [--books 20] [--chunks 3000] [--dim 768] [--k 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.bench_shards import RandomEmbeddings, percentile
+from core.numpy_vector_store import NumpyVectorStore
+from core.vector_store import VectorStore
+
+
+def make_book(rng: np.random.Generator, chunks: int, dim: int) -> np.ndarray:
+    # Chunks of a book cluster around a few topics
+    centers = rng.normal(size=(16, dim))
+    vectors = centers[rng.integers(0, 16, chunks)] + rng.normal(scale=0.8, size=(chunks, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=3000, help="Chunks per book")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    books = {f"book_{i:03d}": make_book(rng, args.chunks, args.dim) for i in range(args.books)}
+    queries = []
+    for _ in range(args.queries):
+        book_id = f"book_{rng.integers(args.books):03d}"
+        query = books[book_id][rng.integers(args.chunks)] + rng.normal(scale=0.03, size=args.dim)
+        exact = np.argsort(-(books[book_id] @ query))[:args.k]
+        queries.append((book_id, query.astype(np.float32).tolist(), {f"{book_id}-{row}" for row in exact}))
+
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {
+            "chroma": lambda: VectorStore(
+                collection_name="bench", persist_directory=os.path.join(directory, "chroma"),
+                embedding_function=RandomEmbeddings(args.dim), shard_mode="none"),
+            "numpy-float16": lambda: NumpyVectorStore(os.path.join(directory, "float16"), dtype="float16"),
+            "numpy-int8": lambda: NumpyVectorStore(os.path.join(directory, "int8"), dtype="int8"),
+        }
+        for name, factory in backends.items():
+            store = factory()
+            started = time.perf_counter()
+            for book_id, vectors in books.items():
+                documents = [Document(page_content=f"{book_id} chunk {row}", metadata={"book_id": book_id})
+                             for row in range(args.chunks)]
+                ids = [f"{book_id}-{row}" for row in range(args.chunks)]
+                for start in range(0, args.chunks, 1000):
+                    store.upsert_embeddings(documents[start:start + 1000], ids[start:start + 1000],
+                                            vectors[start:start + 1000].tolist())
+            build_seconds = time.perf_counter() - started
+
+            # Warm up: first touch of each book maps / loads its index
+            for book_id in books:
+                store.similarity_search_by_vector(queries[0][1], k=args.k, filter={"book_id": book_id})
+            latencies, hits = [], 0
+            for book_id, query, expected in queries:
+                started = time.perf_counter()
+                docs = store.similarity_search_by_vector(query, k=args.k, filter={"book_id": book_id})
+                latencies.append((time.perf_counter() - started) * 1000)
+                # The Chroma wrapper does not fill Document.id, the text carries the row
+                hits += len({f"{book_id}-{doc.page_content.rsplit(' ', 1)[1]}" for doc in docs} & expected)
+            print(json.dumps({
+                "backend": name,
+                "chunks": args.books * args.chunks,
+                f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "build_seconds": round(build_seconds, 1),
+                "disk_mb": round(directory_size(store.persist_directory) / 2 ** 20, 1),
+            }), flush=True)
+
+
+if __name__ == "__main__":
+    main()
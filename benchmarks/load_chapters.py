@@ -0,0 +1,128 @@
+"""
+Load test for concurrent /book/chapter requests.
+
+Readers request random chapters at a fixed arrival rate (open loop, latency is
+measured from the scheduled start so queueing on a blocked event loop counts)
+while the largest book is run through extract_text_from_book a few times in
+the background, the way an ingestion does. The run is repeated once per executor
+configuration. The rendered chapter cache and prefetch are disabled so every
+request does the full read + render work.
+
+    uv run python -m benchmarks.load_chapters [--rate 200] [--duration 5] [--extractions 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+
+CONFIGURATIONS = {
+    "inline": {"IO_WORKERS": "0", "CPU_WORKERS": "0"},
+    "threads": {"IO_WORKERS": "8", "CPU_WORKERS": "4", "CPU_EXECUTOR": "thread"},
+    "processes": {"IO_WORKERS": "8", "CPU_WORKERS": "4", "CPU_EXECUTOR": "process"},
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_load(rate: float, duration: float, extractions: int) -> dict:
+    import httpx
+
+    import run
+    from settings import settings
+    from api.services.chapters import rendered_chapter_cache
+    from api.services.epub import EPUBData
+
+    settings.chapter_prefetch_depth = 0
+    rendered_chapter_cache.max_entries = 0
+
+    epub_service = EPUBData()
+    books = epub_service.get_books()
+    targets = []
+    for book in books:
+        structure = await epub_service.get_book_structure(book["path"])
+        targets.extend((book["filename"], index) for index in range(len(structure.spine)))
+    largest_book = max(books, key=lambda book: book["size"])["path"]
+
+    random.seed(0)
+    total_requests = int(rate * duration)
+    latencies = []
+
+    transport = httpx.ASGITransport(app=run.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        async def request(scheduled: float, filename: str, chapter_index: int):
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await client.get("/book/chapter", params={
+                "filename": filename, "chapter_index": chapter_index
+            })
+            latencies.append(time.perf_counter() - scheduled)
+            assert response.status_code == 200, response.text
+
+        async def ingest():
+            for _ in range(extractions):
+                await epub_service.extract_text_from_book(largest_book)
+                # Inline executors never suspend, give readers a chance between books
+                await asyncio.sleep(0)
+
+        ingest_task = asyncio.create_task(ingest())
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            request(started + i / rate, *random.choice(targets))
+            for i in range(total_requests)
+        ))
+        await ingest_task
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total_requests,
+        "rps": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "max_ms": max(latencies) * 1e3,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200, help="chapter requests per second")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of load")
+    parser.add_argument("--extractions", type=int, default=3, help="background extractions of the largest book")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_load(args.rate, args.duration, args.extractions))
+        print(json.dumps(result))
+        return
+
+    print(f"{args.rate:.0f} chapter requests/s for {args.duration:.0f}s, "
+          f"{args.extractions} background extractions of the largest book")
+    print(f"{'config':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, env in CONFIGURATIONS.items():
+        command = [sys.executable, "-m", "benchmarks.load_chapters", "--worker",
+                   "--rate", str(args.rate), "--duration", str(args.duration),
+                   "--extractions", str(args.extractions)]
+        output = subprocess.run(
+            command,
+            env={**os.environ, **env},
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<10} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['max_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
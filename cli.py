@@ -0,0 +1,64 @@
+"""
+Command line entry points for library maintenance.
+
+    uv run python cli.py index-library [--workers N] [--force] [book.epub ...]
+    uv run python cli.py migrate-shards --mode book|bucket [--buckets N] [--source books] [--delete-source]
+"""
+import argparse
+import asyncio
+import json
+
+from core.bulk_indexer import BulkIndexer
+from core.executors import executors
+from core.rag_service import RAGService
+from core.vector_store import VectorStore
+
+
+async def index_library(args: argparse.Namespace) -> None:
+    indexer = BulkIndexer(RAGService(), workers=args.workers)
+    summary = await indexer.run(filenames=args.books or None, force=args.force)
+    print(json.dumps(summary, indent=2))
+    print(
+        f"Indexed {summary['indexed']} books ({summary['skipped']} skipped, {summary['failed']} failed) "
+        f"in {summary['elapsed_seconds']:.1f}s: "
+        f"{summary['books_per_second']:.2f} books/s, {summary['chunks_per_second']:.1f} chunks/s"
+    )
+
+
+async def migrate_shards(args: argparse.Namespace) -> None:
+    store = VectorStore(collection_name=args.source, shard_mode=args.mode, shard_buckets=args.buckets)
+    result = store.migrate_from_collection(args.source, batch_size=args.batch_size, delete_source=args.delete_source)
+    print(json.dumps({**result, **store.get_collection_info()}, indent=2))
+    print(f"Set VECTOR_SHARD_MODE={args.mode}" + (f" and VECTOR_SHARD_BUCKETS={args.buckets}" if args.buckets else "")
+          + " to serve from the shards")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Book app maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index-library", help="Index all stored books for RAG (resumable)")
+    index_parser.add_argument("books", nargs="*", help="EPUB filenames (default: whole library)")
+    index_parser.add_argument("--workers", type=int, default=None, help="Books indexed in parallel")
+    index_parser.add_argument("--force", action="store_true", help="Ignore checkpoints and re-index everything")
+    index_parser.set_defaults(handler=index_library)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate-shards", help="Copy the single vector collection into per-book or per-bucket collections"
+    )
+    migrate_parser.add_argument("--mode", choices=["book", "bucket"], required=True, help="Sharding mode")
+    migrate_parser.add_argument("--buckets", type=int, default=None, help="Collections in bucket mode")
+    migrate_parser.add_argument("--source", default="books", help="Collection to migrate from")
+    migrate_parser.add_argument("--batch-size", type=int, default=500, help="Chunks copied per request")
+    migrate_parser.add_argument("--delete-source", action="store_true", help="Drop the source collection afterwards")
+    migrate_parser.set_defaults(handler=migrate_shards)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(args.handler(args))
+    finally:
+        executors.shutdown()
+
+
+if __name__ == "__main__":
+    main()
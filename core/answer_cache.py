@@ -0,0 +1,262 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.utils.lru_cache import LRUCache
+from settings import settings
+
+
+_SPACE_RE = re.compile(r"\s+")
+# Trailing punctuation does not change the question
+_TRAILING_RE = re.compile(r"[\s?!.¿¡。？！]+$")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact matching: Unicode NFKC, case folding,
+    collapsed whitespace and no trailing punctuation.
+
+    Args:
+        question: Question as asked
+
+    Returns:
+        Normalized question
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _SPACE_RE.sub(" ", text).strip()
+    return _TRAILING_RE.sub("", text)
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _SemanticEntries:
+    """
+    Question embeddings of one (book, version, model): unit vectors in the rows
+    of a preallocated matrix, so a lookup is one matrix-vector product.
+    Rows 0..len-1 are in use; an evicted row is reused by the next question.
+    """
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.answers: List[Optional[str]] = [None] * capacity
+        self.row_keys: List[Optional[str]] = [None] * capacity
+        # normalized question -> row, least recently used first
+        self.rows: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def best(self, query: np.ndarray) -> Tuple[float, Optional[str]]:
+        """Highest cosine similarity with a unit query and its question key."""
+        if not self.rows:
+            return -1.0, None
+        scores = self.matrix[:len(self.rows)] @ query
+        row = int(np.argmax(scores))
+        return float(scores[row]), self.row_keys[row]
+
+    def put(self, key: str, vector: np.ndarray, answer: str) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            if len(self.rows) < self.capacity:
+                row = len(self.rows)
+            else:
+                _, row = self.rows.popitem(last=False)
+        self.matrix[row] = vector
+        self.answers[row] = answer
+        self.row_keys[row] = key
+        self.rows[key] = row
+        self.rows.move_to_end(key)
+
+    def touch(self, key: str) -> str:
+        self.rows.move_to_end(key)
+        return self.answers[self.rows[key]]
+
+
+class AnswerCache:
+    """
+    Two-tier cache of /book/ask answers.
+
+    The exact tier maps (book id, book version, model, normalized question) to the
+    answer. The optional semantic tier keeps the question embeddings of recent
+    answers per book and reuses an answer when a new question's cosine similarity
+    reaches the threshold. A new book version (re-uploaded file) misses both
+    tiers, and invalidate_book() drops a book's entries when it is re-indexed.
+
+    Example:
+        cache = AnswerCache(max_entries=1024, similarity_threshold=0.95)
+        answer = cache.get(book_id, version, question) or cache.get_similar(book_id, version, vector)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        similarity_threshold: Optional[float] = None,
+        semantic_max_per_book: int = 256
+    ):
+        """
+        Initialize answer cache.
+
+        Args:
+            max_entries: Exact-tier entries kept before LRU eviction
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+                                  (None disables the semantic tier)
+            semantic_max_per_book: Question embeddings kept per book and version
+        """
+        self.similarity_threshold = similarity_threshold
+        self.semantic_max_per_book = semantic_max_per_book
+        self._exact = LRUCache(max_entries)
+        # (book_id, version, model) -> question embeddings and answers
+        self._semantic: Dict[Tuple[str, str, str], _SemanticEntries] = {}
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+        self.semantic_misses = 0
+
+    @classmethod
+    def from_settings(cls) -> Optional["AnswerCache"]:
+        """
+        Create an answer cache from settings.
+
+        Returns:
+            AnswerCache, or None if disabled
+        """
+        if not settings.answer_cache_enabled:
+            return None
+        return cls(
+            max_entries=settings.answer_cache_max_entries,
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            semantic_max_per_book=settings.answer_cache_semantic_max_per_book
+        )
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.similarity_threshold is not None
+
+    @staticmethod
+    def _model() -> str:
+        return f"{settings.default_llm_provider}:{settings.default_llm_model}"
+
+    def get(self, book_id: str, version: str, question: str) -> Optional[str]:
+        """
+        Look up an answer to the exact (normalized) question.
+
+        Args:
+            book_id: Book identifier
+            version: Book version tag
+            question: Question as asked
+
+        Returns:
+            Cached answer or None
+        """
+        return self._exact.get((book_id, version, self._model(), normalize_question(question)))
+
+    def get_similar(self, book_id: str, version: str, vector: List[float]) -> Optional[str]:
+        """
+        Look up the answer to the most similar cached question of a book.
+
+        Args:
+            book_id: Book identifier
+            version: Book version tag
+            vector: Embedding of the new question
+
+        Returns:
+            Cached answer if the best similarity reaches the threshold, else None
+        """
+        if not self.semantic_enabled:
+            return None
+        query = _unit(vector)
+        with self._lock:
+            entries = self._semantic.get((book_id, version, self._model()))
+            if entries is not None and entries.dim == len(query):
+                best_score, best_key = entries.best(query)
+                if best_key is not None and best_score >= self.similarity_threshold:
+                    self.semantic_hits += 1
+                    return entries.touch(best_key)
+            self.semantic_misses += 1
+            return None
+
+    def put(
+        self,
+        book_id: str,
+        version: str,
+        question: str,
+        answer: str,
+        vector: Optional[List[float]] = None
+    ) -> None:
+        """
+        Store an answer.
+
+        Args:
+            book_id: Book identifier
+            version: Book version tag
+            question: Question as asked
+            answer: Generated answer
+            vector: Question embedding, stored for the semantic tier
+        """
+        normalized = normalize_question(question)
+        model = self._model()
+        self._exact.put((book_id, version, model, normalized), answer)
+        if not self.semantic_enabled or vector is None:
+            return
+        with self._lock:
+            # Only the current version of a book is worth keeping
+            for key in [key for key in self._semantic if key[0] == book_id and key[1] != version]:
+                del self._semantic[key]
+            unit = _unit(vector)
+            entries = self._semantic.get((book_id, version, model))
+            if entries is None or entries.dim != len(unit):
+                entries = _SemanticEntries(max(1, self.semantic_max_per_book), len(unit))
+                self._semantic[(book_id, version, model)] = entries
+            entries.put(normalized, unit, answer)
+
+    def invalidate_book(self, book_id: str) -> int:
+        """
+        Drop every cached answer of a book.
+
+        Args:
+            book_id: Book identifier
+
+        Returns:
+            Number of removed exact-tier entries
+        """
+        with self._lock:
+            for key in [key for key in self._semantic if key[0] == book_id]:
+                del self._semantic[key]
+        return self._exact.pop_matching(lambda key: key[0] == book_id)
+
+    def clear(self) -> None:
+        self._exact.clear()
+        with self._lock:
+            self._semantic.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Exact-tier LRU stats plus semantic-tier counters
+        """
+        with self._lock:
+            semantic_entries = sum(len(entries) for entries in self._semantic.values())
+        return {
+            "exact": self._exact.stats(),
+            "semantic": {
+                "enabled": self.semantic_enabled,
+                "threshold": self.similarity_threshold,
+                "entries": semantic_entries,
+                "hits": self.semantic_hits,
+                "misses": self.semantic_misses,
+            },
+        }
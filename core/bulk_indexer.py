@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from settings import settings
+from api.utils.book_version import get_book_version
+from core.executors import executors
+
+
+class BulkIndexer:
+    """
+    Index the whole books library for RAG with N books processed in parallel.
+
+    Per-book checkpoints are written to a JSON file after every book, so an
+    interrupted run skips the books that were already indexed (unless the file
+    changed since) and resumes with the rest.
+
+    Example:
+        indexer = BulkIndexer(RAGService(), workers=4)
+        summary = await indexer.run()
+    """
+
+    def __init__(
+        self,
+        rag_service,
+        checkpoint_path: Optional[str] = None,
+        workers: Optional[int] = None
+    ):
+        """
+        Initialize bulk indexer.
+
+        Args:
+            rag_service: RAGService used to process books
+            checkpoint_path: Checkpoint JSON file (default from settings)
+            workers: Books processed in parallel (default from settings)
+        """
+        self.rag_service = rag_service
+        self.checkpoint_path = Path(checkpoint_path or settings.bulk_index_checkpoint_path)
+        self.workers = workers or settings.bulk_index_workers
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+        self.running = False
+        self.progress: Dict[str, Any] = {}
+        self.last_summary: Optional[Dict[str, Any]] = None
+        self._lock = asyncio.Lock()
+
+    def _load_checkpoints(self) -> Dict[str, Dict[str, Any]]:
+        if not self.checkpoint_path.exists():
+            return {}
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def _write_checkpoints(self, checkpoints: Dict[str, Dict[str, Any]]) -> None:
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoints, f, indent=1)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    async def _checkpoint(self, filename: str, record: Dict[str, Any]) -> None:
+        async with self._lock:
+            self.checkpoints[filename] = record
+            await executors.run_io(self._write_checkpoints, dict(self.checkpoints))
+
+    def is_indexed(self, filename: str) -> bool:
+        """
+        Check whether the current version of a book has a successful checkpoint.
+
+        Args:
+            filename: EPUB filename in the books directory
+
+        Returns:
+            True if the book can be skipped
+        """
+        record = self.checkpoints.get(filename)
+        if not record or record.get("status") != "done":
+            return False
+        try:
+            version = get_book_version(os.path.join(settings.books_path, filename))
+        except FileNotFoundError:
+            return False
+        return record.get("mtime_ns") == version.mtime_ns and record.get("size") == version.size
+
+    async def forget(self, filename: str) -> None:
+        """Drop the checkpoint of a book (e.g. after it was deleted)."""
+        async with self._lock:
+            self.checkpoints = await executors.run_io(self._load_checkpoints)
+            if self.checkpoints.pop(filename, None) is not None:
+                await executors.run_io(self._write_checkpoints, dict(self.checkpoints))
+
+    async def run(
+        self,
+        filenames: Optional[List[str]] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Index the library.
+
+        Args:
+            filenames: Books to index (default: every .epub in the books directory)
+            force: Re-index books that already have a checkpoint
+
+        Returns:
+            Summary with counts, elapsed time and throughput
+        """
+        self._mark_running()
+        return await self._run_marked(filenames, force)
+
+    def start(self, force: bool = False) -> asyncio.Task:
+        """
+        Start indexing the whole library in a background task.
+        The indexer is marked running before this returns, so a second call
+        fails immediately instead of from inside the task.
+
+        Args:
+            force: Re-index books that already have a checkpoint
+
+        Returns:
+            Task running the indexing, its result is the summary
+        """
+        self._mark_running()
+        return asyncio.create_task(self._run_marked(None, force))
+
+    def _mark_running(self) -> None:
+        if self.running:
+            raise RuntimeError("Bulk indexing is already running")
+        self.running = True
+
+    async def _run_marked(self, filenames: Optional[List[str]], force: bool) -> Dict[str, Any]:
+        try:
+            return await self._run(filenames, force)
+        finally:
+            self.running = False
+
+    async def _run(self, filenames: Optional[List[str]], force: bool) -> Dict[str, Any]:
+        self.checkpoints = await executors.run_io(self._load_checkpoints)
+        if filenames is None:
+            filenames = sorted(book["filename"] for book in self.rag_service.epub_service.get_books())
+
+        pending = [f for f in filenames if force or not self.is_indexed(f)]
+        self.progress = {
+            "total_books": len(filenames),
+            "skipped": len(filenames) - len(pending),
+            "indexed": 0,
+            "failed": 0,
+            "chunks": 0,
+            "in_progress": [],
+        }
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for filename in pending:
+            queue.put_nowait(filename)
+
+        async def worker() -> None:
+            while not queue.empty():
+                filename = queue.get_nowait()
+                await self._index_book(filename, force)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(self.workers, 1))))
+        elapsed = time.perf_counter() - started
+
+        summary = {
+            **{k: v for k, v in self.progress.items() if k != "in_progress"},
+            "elapsed_seconds": round(elapsed, 3),
+            "books_per_second": round(self.progress["indexed"] / elapsed, 3) if elapsed else 0.0,
+            "chunks_per_second": round(self.progress["chunks"] / elapsed, 3) if elapsed else 0.0,
+        }
+        self.last_summary = summary
+        return summary
+
+    async def _index_book(self, filename: str, force: bool) -> None:
+        epub_path = os.path.join(settings.books_path, filename)
+        self.progress["in_progress"].append(filename)
+        try:
+            # Version is taken before processing so a file replaced mid-run is indexed again next time
+            version = get_book_version(epub_path)
+            result = await self.rag_service.process_book(epub_path, force=force)
+        except Exception as e:
+            self.progress["failed"] += 1
+            await self._checkpoint(filename, {"status": "failed", "error": str(e), "finished_at": time.time()})
+            return
+        finally:
+            self.progress["in_progress"].remove(filename)
+
+        # Unchanged books come back from process_book without any work done
+        if result["skipped"]:
+            self.progress["skipped"] += 1
+        else:
+            self.progress["indexed"] += 1
+            self.progress["chunks"] += result["new_chunks"]
+        await self._checkpoint(filename, {
+            "status": "done",
+            "book_id": result["book_id"],
+            "chunks": result["total_chunks"],
+            "mtime_ns": version.mtime_ns,
+            "size": version.size,
+            "finished_at": time.time(),
+        })
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "progress": self.progress,
+            "last_summary": self.last_summary,
+        }
@@ -0,0 +1,233 @@
+import hashlib
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from core.executors import executors
+
+
+# sqlite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed cache of embedding vectors.
+
+    Vectors are stored in SQLite keyed by (model name, sha256 of the text) as
+    packed float32 or float16 blobs. The least recently used entries are
+    evicted once max_entries is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 500_000,
+        dtype: str = "float32"
+    ):
+        """
+        Initialize embedding cache.
+
+        Args:
+            path: SQLite database file
+            max_entries: Maximum number of cached vectors
+            dtype: Storage precision, "float32" or "float16"
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported dtype: '{dtype}'. Use 'float32' or 'float16'")
+        self.path = path
+        self.max_entries = max_entries
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def _pack(self, vector: List[float]) -> bytes:
+        if self.dtype == "float16":
+            return struct.pack(f"<{len(vector)}e", *vector)
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob: bytes, dtype: str) -> List[float]:
+        if dtype == "float16":
+            return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+        return array("f", blob).tolist()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up vectors for texts.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Vector per text, None for misses
+        """
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, dtype, blob in rows:
+                    found[text_hash] = self._unpack(blob, dtype)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+        results = [found.get(text_hash) for text_hash in hashes]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """
+        Store vectors for texts and evict the least recently used entries over the cap.
+
+        Args:
+            model: Embedding model name
+            texts: Embedded texts
+            vectors: Their vectors
+        """
+        now = time.time()
+        rows = [
+            (model, self.text_hash(text), self.dtype, self._pack(vector), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, dtype, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._entries += self._conn.total_changes - before
+
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE (model, text_hash) IN "
+                    "(SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._entries -= overflow
+                self.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._entries = 0
+
+    def stats(self) -> Dict[str, int | str]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with entries, hits, misses and evictions
+        """
+        return {
+            "path": self.path,
+            "dtype": self.dtype,
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings that consult an EmbeddingCache before the wrapped model.
+    Only texts missing from the cache are sent to the model (once per distinct text).
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        """
+        Args:
+            embeddings: Wrapped embeddings model
+            cache: Vector cache
+            model_name: Model name used as part of the cache key
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(self.model_name, missing, [embedded[text] for text in missing])
+            vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many(self.model_name, [text])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model_name, [text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # SQLite lookups block, keep them off the event loop
+        vectors = await executors.run_io(self.cache.get_many, self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, await self.embeddings.aembed_documents(missing)))
+            await executors.run_io(self.cache.put_many, self.model_name, missing, [embedded[text] for text in missing])
+            vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -1,18 +1,26 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
+from core.embedding_cache import CachedEmbeddings, EmbeddingCache
+from core.ollama_embed_client import AsyncOllamaEmbedClient, BatchedOllamaEmbeddings
+from core.query_batcher import QueryEmbeddingBatcher
+from settings import settings
 
 
 class EmbeddingService:
     """
     Service for generating text embeddings.
     Uses Ollama embeddings by default, but can be extended.
+    Vectors are served from a persistent EmbeddingCache when enabled in settings.
+    Async methods send concurrent batched requests over a pooled HTTP client,
+    and concurrent async queries are coalesced into batches when enabled in settings.
     """
     
     def __init__(
         self,
         model_name: str = "embeddinggemma",
-        base_url: str = "http://localhost:11434"
+        base_url: str = "http://localhost:11434",
+        cache: Optional[EmbeddingCache] = None
     ):
         """
         Initialize embedding service.
@@ -21,9 +29,21 @@ class EmbeddingService:
             model_name: Ollama embedding model name
                        (embeddinggemma is a good default for embeddings)
             base_url: Ollama API base URL
+            cache: Optional vector cache (default: created from settings if enabled)
         """
         self.model_name = model_name
         self.base_url = base_url
+        if cache is None and settings.embedding_cache_enabled:
+            cache = EmbeddingCache(
+                path=settings.embedding_cache_path,
+                max_entries=settings.embedding_cache_max_entries,
+                dtype=settings.embedding_cache_dtype
+            )
+        self.cache = cache
+        self.client = AsyncOllamaEmbedClient.from_settings(model_name, base_url)
+        self.query_batcher: Optional[QueryEmbeddingBatcher] = None
+        if settings.query_batching_enabled:
+            self.query_batcher = QueryEmbeddingBatcher.from_settings(self.aembed_documents)
         self._embeddings: Optional[Embeddings] = None
     
     @property
@@ -35,10 +55,16 @@ class EmbeddingService:
             LangChain Embeddings instance
         """
         if self._embeddings is None:
-            self._embeddings = OllamaEmbeddings(
-                model=self.model_name,
-                base_url=self.base_url
+            embeddings = BatchedOllamaEmbeddings(
+                OllamaEmbeddings(
+                    model=self.model_name,
+                    base_url=self.base_url
+                ),
+                self.client
             )
+            if self.cache is not None:
+                embeddings = CachedEmbeddings(embeddings, self.cache, self.model_name)
+            self._embeddings = embeddings
         return self._embeddings
     
     def embed_query(self, text: str) -> List[float]:
@@ -64,3 +90,57 @@ class EmbeddingService:
             List of embedding vectors
         """
         return self.embeddings.embed_documents(texts)
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        """
+        Generate embedding for a single query without blocking the event loop.
+        Concurrent queries are sent together through the query batcher.
+        
+        Args:
+            text: Text to embed
+            
+        Returns:
+            Embedding vector
+        """
+        if self.query_batcher is not None:
+            return await self.query_batcher.embed(text)
+        return await self.embeddings.aembed_query(text)
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple documents in concurrent batches.
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            List of embedding vectors
+        """
+        return await self.embeddings.aembed_documents(texts)
+    
+    async def aclose(self) -> None:
+        """
+        Close pooled HTTP connections.
+        """
+        await self.client.aclose()
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Get embedding cache counters.
+        
+        Returns:
+            Cache statistics, or None if the cache is disabled
+        """
+        return self.cache.stats() if self.cache is not None else None
+    
+    def client_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding client counters.
+        
+        Returns:
+            Request and retry counts, and query batching counters
+        """
+        stats = self.client.stats()
+        if self.query_batcher is not None:
+            stats["query_batching"] = self.query_batcher.stats()
+        return stats
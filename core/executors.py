@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from settings import settings
+
+
+T = TypeVar("T")
+
+# Worker processes are spawned: forking a process that already runs I/O threads is not safe
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class BlockingExecutors:
+    """
+    Bounded pools for work that must not run on the event loop.
+
+    File and archive I/O goes to a thread pool (io_workers). CPU-bound parsing
+    goes to cpu_workers threads or processes, depending on cpu_executor.
+    A pool size of 0 runs the work inline on the event loop.
+    Bulk work that is split into many independent pieces (e.g. extracting all
+    chapters of a book) fans out to a separate process pool (parallel_workers).
+
+    Example:
+        text = await executors.run_cpu(extract_chapter_text, chapter_bytes)
+    """
+
+    def __init__(
+        self,
+        io_workers: Optional[int] = None,
+        cpu_workers: Optional[int] = None,
+        cpu_executor: Optional[str] = None,
+        parallel_workers: Optional[int] = None
+    ):
+        """
+        Initialize executors (pools are created lazily).
+        Arguments left as None are taken from settings.
+
+        Args:
+            io_workers: Threads for blocking file I/O
+            cpu_workers: Workers for CPU-bound parsing
+            cpu_executor: "thread" or "process"
+            parallel_workers: Processes for fan-out work (0 = one per CPU core)
+        """
+        io_workers = io_workers if io_workers is not None else settings.io_workers
+        cpu_workers = cpu_workers if cpu_workers is not None else settings.cpu_workers
+        cpu_executor = cpu_executor or settings.cpu_executor
+        parallel_workers = parallel_workers if parallel_workers is not None else settings.parallel_workers
+        if cpu_executor not in ("thread", "process"):
+            raise ValueError(f"Unsupported cpu_executor: '{cpu_executor}'. Use 'thread' or 'process'")
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.cpu_executor = cpu_executor
+        self.parallel_workers = parallel_workers or os.cpu_count() or 1
+        self._io_pool: Optional[Executor] = None
+        self._cpu_pool: Optional[Executor] = None
+        self._parallel_pool: Optional[Executor] = None
+
+    @classmethod
+    def from_settings(cls) -> "BlockingExecutors":
+        return cls()
+
+    @property
+    def io_pool(self) -> Optional[Executor]:
+        if self._io_pool is None and self.io_workers > 0:
+            self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="book-io")
+        return self._io_pool
+
+    @property
+    def cpu_pool(self) -> Optional[Executor]:
+        if self._cpu_pool is None and self.cpu_workers > 0:
+            if self.cpu_executor == "process":
+                self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=_MP_CONTEXT)
+            else:
+                self._cpu_pool = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="book-cpu")
+        return self._cpu_pool
+
+    @property
+    def parallel_pool(self) -> Executor:
+        if self._parallel_pool is None:
+            self._parallel_pool = ProcessPoolExecutor(max_workers=self.parallel_workers, mp_context=_MP_CONTEXT)
+        return self._parallel_pool
+
+    @staticmethod
+    async def _run(pool: Optional[Executor], func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if pool is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+    async def run_io(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run blocking I/O in the I/O thread pool.
+
+        Args:
+            func: Callable to run
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            Result of func
+        """
+        return await self._run(self.io_pool, func, *args, **kwargs)
+
+    async def run_cpu(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run CPU-bound work in the CPU pool.
+        With cpu_executor="process" func and its arguments must be picklable
+        (module-level functions, plain data).
+
+        Args:
+            func: Callable to run
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            Result of func
+        """
+        return await self._run(self.cpu_pool, func, *args, **kwargs)
+
+    async def run_parallel(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run one piece of fan-out work in the parallel process pool.
+        func and its arguments must be picklable.
+
+        Args:
+            func: Callable to run
+            *args, **kwargs: Arguments for func
+
+        Returns:
+            Result of func
+        """
+        return await self._run(self.parallel_pool, func, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down all pools; they are recreated on next use."""
+        for pool in (self._io_pool, self._cpu_pool, self._parallel_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+        self._io_pool = None
+        self._cpu_pool = None
+        self._parallel_pool = None
+
+
+# Shared by services and routes
+executors = BlockingExecutors.from_settings()
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from settings import settings
+from core.executors import executors
+
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class IngestionJob:
+    """
+    State of one book ingestion (extract → chunk → embed → upsert).
+
+    Attributes:
+        job_id: Job identifier returned to the client
+        filename: EPUB filename
+        path: Path to the EPUB file
+        status: queued, running, done or failed
+        stage: Current pipeline stage reported by RAGService.process_book
+        chunks_total: Number of chunks to embed (known after chunking)
+        chunks_embedded: Chunks embedded and stored so far
+        error: Error message if the job failed
+        result: Result of RAGService.process_book when done
+    """
+    job_id: str
+    filename: str
+    path: str
+    status: str = QUEUED
+    stage: str = QUEUED
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class IngestionQueue:
+    """
+    Worker queue running RAGService.process_book in the background.
+
+    Every state change is appended to a JSON-lines journal, so jobs that were
+    queued or running when the server stopped are picked up again on start.
+    """
+
+    def __init__(
+        self,
+        rag_service,
+        journal_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        history: Optional[int] = None
+    ):
+        """
+        Initialize ingestion queue.
+
+        Args:
+            rag_service: RAGService used to process books
+            journal_path: JSON-lines journal file (default from settings)
+            workers: Number of books processed concurrently (default from settings)
+            history: Finished jobs kept when the journal is compacted (default from settings)
+        """
+        self.rag_service = rag_service
+        self.journal_path = Path(journal_path or settings.ingestion_journal_path)
+        self.workers = workers or settings.ingestion_workers
+        self.history = history if history is not None else settings.ingestion_job_history
+        self.jobs: Dict[str, IngestionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        # Appends and compaction must not interleave
+        self._journal_lock = asyncio.Lock()
+        self._journal_lines = 0
+
+    def _load_journal(self) -> None:
+        """Replay the journal: the last record of each job wins."""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                self._journal_lines += 1
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    self.jobs[record["job_id"]] = IngestionJob(**record)
+                except (ValueError, TypeError, KeyError):
+                    # Torn last line after a crash
+                    continue
+
+    def _write_journal(self, records: List[Dict[str, Any]]) -> None:
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.journal_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as journal:
+            for record in records:
+                journal.write(json.dumps(record) + "\n")
+        os.replace(tmp_path, self.journal_path)
+
+    async def _compact_journal(self) -> None:
+        """Rewrite the journal with one record per job, dropping old finished jobs."""
+        finished = sorted(
+            (job for job in self.jobs.values() if job.status in (DONE, FAILED)),
+            key=lambda job: job.updated_at
+        )
+        for job in finished[:max(len(finished) - self.history, 0)]:
+            del self.jobs[job.job_id]
+        # Snapshot on the event loop, the jobs keep changing while the file is written
+        records = [job.to_dict() for job in sorted(self.jobs.values(), key=lambda job: job.created_at)]
+        await executors.run_io(self._write_journal, records)
+        self._journal_lines = len(records)
+
+    def _append_journal(self, record: Dict[str, Any]) -> None:
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps(record) + "\n")
+
+    async def _save(self, job: IngestionJob) -> None:
+        job.updated_at = time.time()
+        async with self._journal_lock:
+            await executors.run_io(self._append_journal, job.to_dict())
+            self._journal_lines += 1
+            # Superseded records pile up on a long-running server: compact once they dominate
+            if self._journal_lines > 2 * max(len(self.jobs), self.history) + 100:
+                await self._compact_journal()
+
+    async def start(self) -> None:
+        """Load the journal, requeue unfinished jobs and start the workers."""
+        self._queue = asyncio.Queue()
+        await executors.run_io(self._load_journal)
+
+        for job in sorted(self.jobs.values(), key=lambda job: job.created_at):
+            if job.status in (QUEUED, RUNNING):
+                # Interrupted by a restart: start over
+                job.status = QUEUED
+                job.stage = QUEUED
+                job.chunks_embedded = 0
+                self._queue.put_nowait(job.job_id)
+        async with self._journal_lock:
+            await self._compact_journal()
+
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Stop the workers; unfinished jobs stay in the journal."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, epub_path: str) -> IngestionJob:
+        """
+        Queue a book for ingestion.
+
+        Args:
+            epub_path: Path to the EPUB file
+
+        Returns:
+            Created job
+        """
+        if self._queue is None:
+            raise RuntimeError("Ingestion queue is not started")
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex,
+            filename=os.path.basename(epub_path),
+            path=str(epub_path)
+        )
+        self.jobs[job.job_id] = job
+        await self._save(job)
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[IngestionJob]:
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None and job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob) -> None:
+        job.status = RUNNING
+        await self._save(job)
+
+        async def progress(stage: str, done: int = 0, total: int = 0) -> None:
+            # Counters are only kept in memory: a restarted job starts over anyway
+            changed = stage != job.stage
+            job.stage = stage
+            job.chunks_embedded = done
+            job.chunks_total = total
+            if changed:
+                await self._save(job)
+            else:
+                job.updated_at = time.time()
+
+        try:
+            if not os.path.exists(job.path):
+                raise FileNotFoundError(f"Book '{job.filename}' not found")
+            result = await self.rag_service.process_book(job.path, progress=progress)
+        except asyncio.CancelledError:
+            # Server is stopping, the journal still says running → requeued on start
+            raise
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            await self._save(job)
+            return
+
+        job.status = DONE
+        job.stage = DONE
+        job.result = {k: v for k, v in result.items() if k != "document_ids"}
+        await self._save(job)
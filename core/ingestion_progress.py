@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from settings import settings
+
+
+class IngestionProgress:
+    """
+    Persisted per-book ingestion progress of the streaming pipeline.
+
+    A book is only complete once every chunk of the file with the recorded
+    hash is stored and stale chunks are deleted. Until then the record keeps
+    the number of chapters and chunks already stored; chunks stored by an
+    interrupted run are not embedded again when the book is processed next.
+
+    Example:
+        progress = IngestionProgress("./data/ingestion_progress.sqlite3")
+        progress.update("my_book", book_hash, chapters_done=3, chunks_stored=120)
+        progress.is_complete("my_book", book_hash)
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize progress store.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS progress (
+                book_id TEXT PRIMARY KEY,
+                book_hash TEXT NOT NULL,
+                complete INTEGER NOT NULL,
+                chapters_done INTEGER NOT NULL,
+                chunks_stored INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls) -> "IngestionProgress":
+        return cls(settings.ingestion_progress_path)
+
+    def get(self, book_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the progress record of a book.
+
+        Args:
+            book_id: Book identifier
+
+        Returns:
+            Record dict, or None if the book was never processed
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT book_hash, complete, chapters_done, chunks_stored, updated_at FROM progress WHERE book_id = ?",
+                (book_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "book_id": book_id,
+            "book_hash": row[0],
+            "complete": bool(row[1]),
+            "chapters_done": row[2],
+            "chunks_stored": row[3],
+            "updated_at": row[4],
+        }
+
+    def is_complete(self, book_id: str, book_hash: str) -> bool:
+        record = self.get(book_id)
+        return record is not None and record["complete"] and record["book_hash"] == book_hash
+
+    def update(
+        self,
+        book_id: str,
+        book_hash: str,
+        chapters_done: int,
+        chunks_stored: int,
+        complete: bool = False
+    ) -> None:
+        """
+        Record progress of a book.
+
+        Args:
+            book_id: Book identifier
+            book_hash: SHA-256 of the EPUB being processed
+            chapters_done: Chapters whose chunks are all stored
+            chunks_stored: Chunks stored so far (new and already present)
+            complete: Whether the whole book is stored and stale chunks removed
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?, ?, ?)",
+                (book_id, book_hash, int(complete), chapters_done, chunks_stored, time.time())
+            )
+            self._conn.commit()
+
+    def forget(self, book_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM progress WHERE book_id = ?", (book_id,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
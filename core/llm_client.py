@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
 from langchain_core.language_models import BaseLanguageModel
 from langchain_ollama import OllamaLLM
 from settings import settings
@@ -22,6 +22,9 @@ class LLMClient:
         
         # Use the LangChain LLM directly
         response = client.llm.invoke("What is a book?")
+        
+        # Or without blocking the event loop
+        response = await client.agenerate("What is a book?")
     """
     
     def __init__(
@@ -108,6 +111,11 @@ class LLMClient:
             self._llm = self._create_llm()
         return self._llm
     
+    def warm_up(self) -> None:
+        """Create the LLM instance now instead of on the first generation."""
+        if self._llm is None:
+            self._llm = self._create_llm()
+    
     def _create_llm(self) -> BaseLanguageModel:
         """
         Create the LangChain LLM instance based on provider.
@@ -145,6 +153,40 @@ class LLMClient:
                 f"Available providers: {', '.join(available)}"
             )
     
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Generate a completion through the LLM's async API.
+        
+        Args:
+            prompt: Prompt text
+            
+        Returns:
+            Generated text
+        """
+        return await self.llm.ainvoke(prompt)
+    
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Generate a completion piece by piece as the model produces it.
+        
+        Args:
+            prompt: Prompt text
+            
+        Yields:
+            Generated text fragments
+        """
+        async for piece in self.llm.astream(prompt):
+            yield piece
+    
+    async def aclose(self) -> None:
+        """Close the HTTP connections held by the LLM instance."""
+        if self._llm is None:
+            return
+        async_client = getattr(self._llm, "_async_client", None)
+        if async_client is not None and hasattr(async_client, "close"):
+            await async_client.close()
+        self._llm = None
+    
     def get_info(self) -> Dict[str, Any]:
         """
         Get information about the current LLM configuration.
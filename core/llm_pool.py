@@ -0,0 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from core.llm_client import LLMClient
+from settings import settings
+
+
+class LLMClientPool:
+    """
+    Process-wide pool of LLM clients, created once at startup.
+
+    Each client (and its HTTP connection pool) is reused across requests instead
+    of being rebuilt per question. A generation checks a client out for its
+    duration, so at most `size` generations run at once and further requests
+    wait for a free client instead of piling onto the model server.
+
+    Example:
+        async with llm_pool.client() as llm_client:
+            answer = await llm_client.agenerate(prompt)
+    """
+
+    def __init__(self, size: int = 4):
+        """
+        Initialize LLM client pool.
+
+        Args:
+            size: Number of clients (concurrent generations)
+        """
+        self.size = max(1, size)
+        self._clients: List[LLMClient] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self.waiting = 0
+        self.generations = 0
+
+    @classmethod
+    def from_settings(cls) -> "LLMClientPool":
+        return cls(size=settings.llm_pool_size)
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    def start(self) -> None:
+        """Create the clients and their LLM instances."""
+        if self.started:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            client = LLMClient.from_settings()
+            client.warm_up()
+            self._clients.append(client)
+            self._idle.put_nowait(client)
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[LLMClient]:
+        """
+        Check out a client for one generation.
+
+        Yields:
+            LLMClient, returned to the pool on exit
+        """
+        # Started lazily when used outside the app (e.g. from the CLI)
+        self.start()
+        self.waiting += 1
+        try:
+            llm_client = await self._idle.get()
+        finally:
+            self.waiting -= 1
+        try:
+            self.generations += 1
+            yield llm_client
+        finally:
+            self._idle.put_nowait(llm_client)
+
+    async def aclose(self) -> None:
+        """Close every client's connections."""
+        for client in self._clients:
+            await client.aclose()
+        self._clients.clear()
+        self._idle = None
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "waiting": self.waiting,
+            "generations": self.generations,
+        }
+
+
+llm_pool = LLMClientPool.from_settings()
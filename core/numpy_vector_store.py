@@ -0,0 +1,608 @@
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.vector_store import VectorStore
+from settings import settings
+
+
+# Rows scored per matrix product, bounds the float32 copy made while searching
+_SEARCH_BLOCK = 4096
+
+
+def _equality_conditions(where: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Chroma-style filters reduced to field == value conditions
+    if not where:
+        return {}
+    if "$and" in where:
+        conditions: Dict[str, Any] = {}
+        for part in where["$and"]:
+            conditions.update(_equality_conditions(part))
+        return conditions
+    conditions = {}
+    for key, value in where.items():
+        if key.startswith("$") or isinstance(value, dict):
+            raise ValueError(f"Unsupported filter for the numpy backend: {where}")
+        conditions[key] = value
+    return conditions
+
+
+def _quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Normalize rows and convert them to the storage type; rows are independent of each other."""
+    # Unit rows, so a dot product with a unit query is the cosine similarity
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    if dtype == "int8":
+        scales = (np.abs(vectors).max(axis=1) / 127).astype(np.float32)
+        stored = np.round(vectors / np.where(scales == 0, 1, scales)[:, None]).astype(np.int8)
+        return stored, scales
+    return vectors.astype(np.float16), None
+
+
+def _write_rows(path: str, blocks: List[Tuple[int, np.ndarray]], total_rows: int) -> None:
+    """Write row blocks at their row offsets and cut the file at total_rows, durably."""
+    row_bytes = None
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        for start, block in blocks:
+            block = np.ascontiguousarray(block)
+            row_bytes = block.itemsize * (block.shape[1] if block.ndim == 2 else 1)
+            f.seek(start * row_bytes)
+            f.write(block.tobytes())
+        if row_bytes is not None:
+            f.truncate(total_rows * row_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class _BookMatrix:
+    """Memory-mapped vectors of one book, rows in chunk position order."""
+
+    def __init__(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray],
+        generation: int,
+        dtype: str
+    ):
+        self.ids = ids
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.vectors = vectors
+        self.scales = scales
+        self.generation = generation
+        self.dtype = dtype
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row with a unit query vector."""
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), _SEARCH_BLOCK):
+            block = np.asarray(self.vectors[start:start + _SEARCH_BLOCK], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+
+class NumpyVectorStore:
+    """
+    In-process exact vector index with the VectorStore interface.
+
+    Each book's embeddings are kept as one contiguous memory-mapped matrix of
+    unit vectors, stored as float16 or as int8 with a float32 scale per row;
+    ids, texts, metadata and the row count live in a SQLite side table. New
+    rows are appended to the file and only changed rows are rewritten, always
+    before the SQLite commit that makes them visible; deletions write a new
+    file generation that the commit switches to. Searches are
+    a brute-force dot product over the matrix of the requested book, which for
+    a few thousand chunks is faster than an HNSW query through Chroma.
+    Scores are squared L2 distances (2 - 2 * cosine), like Chroma's default.
+
+    Example:
+        store = NumpyVectorStore(embedding_function=embeddings, dtype="int8")
+        docs = store.similarity_search("Who is the narrator?", filter={"book_id": "my_book"})
+    """
+
+    def __init__(
+        self,
+        persist_directory: Optional[str] = None,
+        embedding_function: Optional[Embeddings] = None,
+        dtype: Optional[str] = None
+    ):
+        """
+        Initialize numpy vector store.
+
+        Args:
+            persist_directory: Directory of the matrices and metadata table
+            embedding_function: LangChain embedding function
+            dtype: Vector storage type, "float16" or "int8" (default: from settings)
+        """
+        dtype = dtype or settings.numpy_index_dtype
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported dtype: '{dtype}'. Use 'float16' or 'int8'")
+        self.persist_directory = persist_directory or settings.numpy_index_dir
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._books: Dict[str, _BookMatrix] = {}
+        self._conn = sqlite3.connect(
+            os.path.join(self.persist_directory, "metadata.sqlite3"), check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                book_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                document TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_book ON chunks (book_id, position)")
+        # Vector file of each book: rows are the book's chunks in position order
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS matrices (
+                book_id TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL,
+                dim INTEGER NOT NULL,
+                dtype TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    make_chunk_ids = staticmethod(VectorStore.make_chunk_ids)
+
+    def set_embedding_function(self, embedding_function: Embeddings) -> None:
+        """
+        Set the embedding function.
+
+        Args:
+            embedding_function: LangChain embedding function
+        """
+        self.embedding_function = embedding_function
+
+    def _book_key(self, book_id: str) -> str:
+        return hashlib.sha1(book_id.encode("utf-8")).hexdigest()[:16]
+
+    def _vector_path(self, book_id: str, generation: int, suffix: str = ".vec") -> str:
+        return os.path.join(self.persist_directory, f"{self._book_key(book_id)}.{generation}{suffix}")
+
+    def _remove_files(self, book_id: str, keep_generation: Optional[int] = None) -> None:
+        key = self._book_key(book_id)
+        for name in os.listdir(self.persist_directory):
+            if name.startswith(f"{key}.") and name != f"{key}.{keep_generation}.vec" \
+                    and name != f"{key}.{keep_generation}.scales":
+                os.remove(os.path.join(self.persist_directory, name))
+
+    def _map(self, book_id: str, ids: List[str], generation: int, dim: int, dtype: str) -> _BookMatrix:
+        vectors = np.memmap(self._vector_path(book_id, generation), dtype=np.dtype(dtype), mode="r",
+                            shape=(len(ids), dim))
+        scales = None
+        if dtype == "int8":
+            scales = np.memmap(self._vector_path(book_id, generation, ".scales"), dtype=np.float32, mode="r",
+                               shape=(len(ids),))
+        return _BookMatrix(ids, vectors, scales, generation, dtype)
+
+    def _file_rows(self, book_id: str, generation: int, dim: int, dtype: str) -> int:
+        rows = []
+        for suffix, row_bytes in ((".vec", dim * np.dtype(dtype).itemsize), (".scales", 4)):
+            if suffix == ".scales" and dtype != "int8":
+                continue
+            path = self._vector_path(book_id, generation, suffix)
+            rows.append(os.path.getsize(path) // row_bytes if os.path.exists(path) else 0)
+        return min(rows)
+
+    def _load(self, book_id: str) -> Optional[_BookMatrix]:
+        with self._lock:
+            if book_id in self._books:
+                return self._books[book_id]
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM chunks WHERE book_id = ? ORDER BY position", (book_id,))]
+            if not ids:
+                return None
+            matrix = self._conn.execute(
+                "SELECT generation, dim, dtype FROM matrices WHERE book_id = ?", (book_id,)).fetchone()
+            generation, dim, dtype = matrix if matrix is not None else (0, 0, self.dtype)
+
+            # Files are written before the commit, so they can only fall short of the
+            # table if they were damaged: drop the chunks without a vector, which makes
+            # the next indexing run embed them again
+            stored_rows = self._file_rows(book_id, generation, dim, dtype) if dim else 0
+            if stored_rows < len(ids):
+                self._conn.execute("DELETE FROM chunks WHERE book_id = ? AND position >= ?", (book_id, stored_rows))
+                if not stored_rows:
+                    self._conn.execute("DELETE FROM matrices WHERE book_id = ?", (book_id,))
+                self._conn.commit()
+                ids = ids[:stored_rows]
+            # Leftovers of a generation switch or write that did not commit
+            self._remove_files(book_id, keep_generation=generation if ids else None)
+            if not ids:
+                return None
+            book = self._map(book_id, ids, generation, dim, dtype)
+            self._books[book_id] = book
+            return book
+
+    def upsert_embeddings(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        embeddings: List[List[float]]
+    ) -> None:
+        """
+        Insert or replace documents with precomputed embedding vectors.
+
+        New rows are appended to the book's vector file and replaced rows are
+        overwritten in place; rows already stored are never requantized.
+
+        Args:
+            documents: LangChain Document objects (metadata must contain book_id)
+            ids: Ids for the documents
+            embeddings: One vector per document
+        """
+        by_book: Dict[str, Dict[str, int]] = {}
+        for position, doc in enumerate(documents):
+            # The last occurrence of an id wins
+            by_book.setdefault(doc.metadata["book_id"], {})[ids[position]] = position
+
+        with self._lock:
+            for book_id, positions in by_book.items():
+                current = self._load(book_id)
+                new_vectors = np.asarray([embeddings[i] for i in positions.values()], dtype=np.float32)
+                if current is not None:
+                    generation, dtype, row_ids = current.generation, current.dtype, list(current.ids)
+                    rows = dict(current.rows)
+                    if current.dim != new_vectors.shape[1]:
+                        raise ValueError(
+                            f"Embedding dimension {new_vectors.shape[1]} does not match "
+                            f"the stored {current.dim} of book '{book_id}'"
+                        )
+                else:
+                    generation, dtype, row_ids, rows = 0, self.dtype, [], {}
+                stored, scales = _quantize(new_vectors, dtype)
+
+                # Replaced rows in place, new rows appended after the committed ones
+                first_new = len(row_ids)
+                replaced, appended = [], []
+                for index, chunk_id in enumerate(positions):
+                    row = rows.get(chunk_id)
+                    if row is None:
+                        rows[chunk_id] = len(row_ids)
+                        row_ids.append(chunk_id)
+                        appended.append(index)
+                    else:
+                        replaced.append((row, index))
+                for suffix, array in ((".vec", stored), (".scales", scales)):
+                    if array is None:
+                        continue
+                    blocks = [(row, array[index:index + 1]) for row, index in replaced]
+                    if appended:
+                        blocks.append((first_new, array[appended]))
+                    _write_rows(self._vector_path(book_id, generation, suffix), blocks, len(row_ids))
+
+                # Rows beyond the committed count are ignored until this commit
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                        [(chunk_id, book_id, rows[chunk_id], documents[i].page_content,
+                          json.dumps(documents[i].metadata)) for chunk_id, i in positions.items()]
+                    )
+                    self._conn.execute("INSERT OR IGNORE INTO matrices VALUES (?, ?, ?, ?)",
+                                       (book_id, generation, new_vectors.shape[1], dtype))
+                    self._conn.commit()
+                except BaseException:
+                    self._conn.rollback()
+                    self._books.pop(book_id, None)
+                    raise
+                self._books[book_id] = self._map(book_id, row_ids, generation, new_vectors.shape[1], dtype)
+
+    def upsert_documents(self, documents: List[Document], ids: List[str]) -> List[str]:
+        """
+        Embed and insert or replace documents under the given ids.
+
+        Args:
+            documents: LangChain Document objects
+            ids: Ids for the documents
+
+        Returns:
+            List of document IDs
+        """
+        if self.embedding_function is None:
+            raise ValueError("Embedding function must be set before adding documents")
+        embeddings = self.embedding_function.embed_documents([doc.page_content for doc in documents])
+        self.upsert_embeddings(documents, ids, embeddings)
+        return ids
+
+    def add_documents(
+        self,
+        documents: List[Document],
+        book_id: Optional[str] = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        Add documents to the vector store.
+
+        Args:
+            documents: List of LangChain Document objects
+            book_id: Optional book identifier for metadata filtering
+            **kwargs: ids (optional list of document ids)
+
+        Returns:
+            List of document IDs
+        """
+        if book_id:
+            for doc in documents:
+                if doc.metadata is None:
+                    doc.metadata = {}
+                doc.metadata["book_id"] = book_id
+        ids = kwargs.get("ids") or [str(uuid.uuid4()) for _ in documents]
+        return self.upsert_documents(documents, ids)
+
+    def get_book_ids(self, book_id: str, where: Optional[Dict[str, Any]] = None) -> Set[str]:
+        """
+        Get ids of all stored chunks of a book.
+
+        Args:
+            book_id: Book identifier
+            where: Optional extra metadata conditions
+
+        Returns:
+            Set of chunk ids
+        """
+        conditions = _equality_conditions(where)
+        with self._lock:
+            rows = self._conn.execute("SELECT id, metadata FROM chunks WHERE book_id = ?", (book_id,)).fetchall()
+        if not conditions:
+            return {chunk_id for chunk_id, _ in rows}
+        return {
+            chunk_id for chunk_id, metadata in rows
+            if all(json.loads(metadata).get(key) == value for key, value in conditions.items())
+        }
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]], batch_size: int = 1000) -> None:
+        """
+        Replace metadata of stored chunks without re-embedding them.
+
+        Args:
+            ids: Chunk ids
+            metadatas: New metadata, one per id
+            batch_size: Ids per transaction
+        """
+        with self._lock:
+            for start in range(0, len(ids), batch_size):
+                self._conn.executemany(
+                    "UPDATE chunks SET metadata = ? WHERE id = ?",
+                    [(json.dumps(metadata), chunk_id) for chunk_id, metadata in
+                     zip(ids[start:start + batch_size], metadatas[start:start + batch_size])]
+                )
+                self._conn.commit()
+
+    def delete_ids(self, ids: Iterable[str], batch_size: int = 1000, book_id: Optional[str] = None) -> None:
+        """
+        Delete chunks by id.
+
+        Args:
+            ids: Chunk ids
+            batch_size: Ids per lookup
+            book_id: Book the chunks belong to (looked up otherwise)
+        """
+        ids = list(ids)
+        with self._lock:
+            if book_id is not None:
+                book_ids = [book_id]
+            else:
+                book_ids = set()
+                for start in range(0, len(ids), batch_size):
+                    batch = ids[start:start + batch_size]
+                    book_ids.update(row[0] for row in self._conn.execute(
+                        f"SELECT DISTINCT book_id FROM chunks WHERE id IN ({','.join('?' * len(batch))})", batch))
+            removed = set(ids)
+            for affected in book_ids:
+                current = self._load(affected)
+                if current is None:
+                    continue
+                keep = [row for row, chunk_id in enumerate(current.ids) if chunk_id not in removed]
+                if len(keep) == len(current.ids):
+                    continue
+                if not keep:
+                    self.delete_book(affected)
+                    continue
+                # The kept rows are copied as stored into a new generation the commit switches to
+                generation = current.generation + 1
+                for suffix, array in ((".vec", current.vectors), (".scales", current.scales)):
+                    if array is not None:
+                        _write_rows(self._vector_path(affected, generation, suffix), [(0, array[keep])], len(keep))
+                kept_ids = [current.ids[row] for row in keep]
+                try:
+                    self._conn.executemany("DELETE FROM chunks WHERE id = ?", [
+                        (chunk_id,) for chunk_id in current.ids if chunk_id in removed
+                    ])
+                    self._conn.executemany("UPDATE chunks SET position = ? WHERE id = ?", [
+                        (position, chunk_id) for position, chunk_id in enumerate(kept_ids)
+                    ])
+                    self._conn.execute("UPDATE matrices SET generation = ? WHERE book_id = ?", (generation, affected))
+                    self._conn.commit()
+                except BaseException:
+                    self._conn.rollback()
+                    self._remove_files(affected, keep_generation=current.generation)
+                    raise
+                self._books[affected] = self._map(affected, kept_ids, generation, current.dim, current.dtype)
+                self._remove_files(affected, keep_generation=generation)
+
+    def delete_book(self, book_id: str, batch_size: int = 1000) -> int:
+        """
+        Delete all documents for a specific book.
+
+        Args:
+            book_id: Book identifier
+            batch_size: Unused, accepted for interface compatibility
+
+        Returns:
+            Number of deleted chunks
+        """
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM chunks WHERE book_id = ?", (book_id,)).rowcount
+            self._conn.execute("DELETE FROM matrices WHERE book_id = ?", (book_id,))
+            self._conn.commit()
+            self._books.pop(book_id, None)
+            self._remove_files(book_id)
+        return deleted
+
+    def book_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT book_id FROM chunks")]
+
+    def stored_book_ids(self, batch_size: int = 5000) -> Set[str]:
+        """
+        Get the ids of all books that have chunks in the store.
+
+        Args:
+            batch_size: Unused, accepted for interface compatibility
+
+        Returns:
+            Set of book identifiers
+        """
+        return set(self.book_ids())
+
+    def _search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]]
+    ) -> List[Tuple[Document, float]]:
+        conditions = _equality_conditions(filter)
+        book_id = conditions.pop("book_id", None)
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+
+        candidates: List[Tuple[float, str]] = []
+        for current_book in [book_id] if book_id is not None else self.book_ids():
+            book = self._load(current_book)
+            if book is None:
+                continue
+            scores = book.scores(query)
+            if conditions:
+                # Other metadata conditions: only rows that match them can be returned
+                allowed = self.get_book_ids(current_book, conditions)
+                scores[[chunk_id not in allowed for chunk_id in book.ids]] = -np.inf
+            top = min(k, len(scores))
+            rows = np.argpartition(-scores, top - 1)[:top]
+            candidates += [(float(scores[row]), book.ids[row]) for row in rows if scores[row] > -np.inf]
+
+        best = heapq.nlargest(k, candidates)
+        if not best:
+            return []
+        placeholders = ",".join("?" * len(best))
+        with self._lock:
+            rows = {chunk_id: (document, metadata) for chunk_id, document, metadata in self._conn.execute(
+                f"SELECT id, document, metadata FROM chunks WHERE id IN ({placeholders})",
+                [chunk_id for _, chunk_id in best]
+            )}
+        return [
+            (Document(page_content=rows[chunk_id][0], metadata=json.loads(rows[chunk_id][1]), id=chunk_id),
+             2.0 - 2.0 * score)
+            for score, chunk_id in best if chunk_id in rows
+        ]
+
+    def _embed_query(self, query: str) -> List[float]:
+        if self.embedding_function is None:
+            raise ValueError("Embedding function must be set before searching by text")
+        return self.embedding_function.embed_query(query)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Document]:
+        """
+        Search for similar documents.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            filter: Optional metadata filter (e.g., {"book_id": "book1"})
+            **kwargs: Ignored, accepted for interface compatibility
+
+        Returns:
+            List of similar documents
+        """
+        return [doc for doc, _ in self._search(self._embed_query(query), k, filter)]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Document]:
+        """
+        Search for documents similar to an already computed query embedding.
+
+        Args:
+            embedding: Query embedding vector
+            k: Number of results to return
+            filter: Optional metadata filter
+            **kwargs: Ignored, accepted for interface compatibility
+
+        Returns:
+            List of similar documents
+        """
+        return [doc for doc, _ in self._search(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search for similar documents with distances (lower is closer).
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            filter: Optional metadata filter
+            **kwargs: Ignored, accepted for interface compatibility
+
+        Returns:
+            List of tuples (document, score)
+        """
+        return self._search(self._embed_query(query), k, filter)
+
+    def get_collection_info(self) -> Dict[str, Any]:
+        """
+        Get information about the index.
+
+        Returns:
+            Dictionary with index information
+        """
+        with self._lock:
+            count, books = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT book_id) FROM chunks").fetchone()
+        return {
+            "backend": "numpy",
+            "dtype": self.dtype,
+            "count": count,
+            "books": books,
+            "persist_directory": self.persist_directory
+        }
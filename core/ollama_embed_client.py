@@ -0,0 +1,180 @@
+import asyncio
+import random
+from typing import Any, List, Optional
+
+import httpx
+from langchain_core.embeddings import Embeddings
+
+from settings import settings
+
+
+class AsyncOllamaEmbedClient:
+    """
+    Async client for Ollama's /api/embed endpoint.
+
+    Texts are split into batches of batch_size, at most max_in_flight batches
+    are sent at once over a pooled HTTP client, and failed batches are retried
+    with exponential backoff.
+
+    Example:
+        client = AsyncOllamaEmbedClient("embeddinggemma", batch_size=32, max_in_flight=4)
+        vectors = await client.embed(["first chunk", "second chunk"])
+    """
+
+    # Worth retrying: the server is overloaded or restarting
+    RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        model_name: str,
+        base_url: str = "http://localhost:11434",
+        batch_size: int = 64,
+        max_in_flight: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 120.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize embedding client.
+
+        Args:
+            model_name: Ollama embedding model name
+            base_url: Ollama API base URL
+            batch_size: Texts per /api/embed request
+            max_in_flight: Requests sent concurrently (also the connection pool size)
+            max_retries: Retries per batch on connection errors and retryable statuses
+            backoff: Initial retry delay in seconds, doubled on every attempt
+            timeout: Request timeout in seconds
+            transport: Optional httpx transport (e.g. to test against a fake server)
+        """
+        self.model_name = model_name
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.retries = 0
+
+    @classmethod
+    def from_settings(cls, model_name: str, base_url: Optional[str] = None, **kwargs: Any) -> "AsyncOllamaEmbedClient":
+        return cls(
+            model_name=model_name,
+            base_url=base_url or settings.ollama_base_url,
+            batch_size=settings.embedding_batch_size,
+            max_in_flight=settings.embedding_max_in_flight,
+            max_retries=settings.embedding_max_retries,
+            backoff=settings.embedding_retry_backoff,
+            timeout=settings.embedding_timeout,
+            **kwargs
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled HTTP client (lazy initialization).
+
+        Returns:
+            httpx.AsyncClient
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_in_flight,
+                    max_keepalive_connections=self.max_in_flight
+                ),
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._client
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        client = self.client
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                try:
+                    self.requests += 1
+                    response = await client.post("/api/embed", json={"model": self.model_name, "input": texts})
+                    if response.status_code not in self.RETRY_STATUS:
+                        response.raise_for_status()
+                        embeddings = response.json()["embeddings"]
+                        if len(embeddings) != len(texts):
+                            raise ValueError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+                        return embeddings
+                    error: Exception = httpx.HTTPStatusError(
+                        f"Ollama returned {response.status_code}", request=response.request, response=response
+                    )
+                except httpx.TransportError as e:
+                    error = e
+
+                if attempt >= self.max_retries:
+                    raise error
+                # Exponential backoff with jitter so parallel batches do not retry in lockstep
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+                attempt += 1
+                self.retries += 1
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in concurrent batches.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Embedding vectors in the order of texts
+        """
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        return [vector for batch in results for vector in batch]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "max_in_flight": self.max_in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+        }
+
+
+class BatchedOllamaEmbeddings(Embeddings):
+    """
+    LangChain Embeddings whose async methods go through AsyncOllamaEmbedClient.
+    Sync methods are delegated to a regular (blocking) embeddings instance.
+    """
+
+    def __init__(self, sync_embeddings: Embeddings, client: AsyncOllamaEmbedClient):
+        """
+        Args:
+            sync_embeddings: Embeddings used by the sync methods
+            client: Async batched client used by the async methods
+        """
+        self.sync_embeddings = sync_embeddings
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.sync_embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.sync_embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.embed(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.client.embed([text]))[0]
@@ -0,0 +1,126 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from settings import settings
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into batched calls.
+
+    Queries arriving within `window` seconds of the first pending one (or until
+    `max_batch` distinct queries are pending) are embedded with a single call,
+    and every caller gets its own vector back. A query identical to one already
+    pending or being embedded waits for that result instead of being sent again.
+
+    Example:
+        batcher = QueryEmbeddingBatcher(embeddings.aembed_documents, window=0.005, max_batch=32)
+        vector = await batcher.embed("Who is the narrator?")
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        window: float = 0.005,
+        max_batch: int = 32
+    ):
+        """
+        Initialize batcher.
+
+        Args:
+            embed_batch: Async function embedding a list of texts
+            window: Seconds to wait for more queries after the first pending one
+            max_batch: Distinct queries that trigger an immediate flush
+        """
+        self.embed_batch = embed_batch
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: List[str] = []
+        # Pending and in-progress queries, for de-duplication
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.queries = 0
+        self.deduplicated = 0
+        self.batches = 0
+
+    @classmethod
+    def from_settings(cls, embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]]) -> "QueryEmbeddingBatcher":
+        return cls(
+            embed_batch,
+            window=settings.query_batch_window_ms / 1000,
+            max_batch=settings.query_batch_max_size
+        )
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a query as part of the next batch.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector
+        """
+        self.queries += 1
+        future = self._futures.get(text)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[text] = future
+            self._pending.append(text)
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        # A cancelled caller must not cancel the result shared with the others
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[str]) -> None:
+        self.batches += 1
+        error: Optional[BaseException] = None
+        vectors: List[List[float]] = []
+        try:
+            vectors = await self.embed_batch(batch)
+            if len(vectors) != len(batch):
+                raise ValueError(f"Embedding returned {len(vectors)} vectors for {len(batch)} queries")
+        except BaseException as e:
+            # Cancellation too: callers must not wait for a result that never comes
+            error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            # Every future of the batch is resolved and leaves the de-duplication map
+            for index, text in enumerate(batch):
+                future = self._futures.pop(text)
+                if future.done():
+                    continue
+                if isinstance(error, asyncio.CancelledError):
+                    future.cancel()
+                elif error is not None:
+                    future.set_exception(error)
+                    # Nobody may be waiting any more, don't warn about it
+                    future.exception()
+                else:
+                    future.set_result(vectors[index])
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "queries": self.queries,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+        }
@@ -1,11 +1,23 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from langchain_core.documents import Document
 from api.services.epub import EPUBData
+from api.utils.book_version import file_sha256
+from core.answer_cache import AnswerCache
+from core.ingestion_progress import IngestionProgress
 from core.text_processor import TextProcessor
 from core.embeddings import EmbeddingService
-from core.vector_store import VectorStore
+from core.vector_store import create_vector_store
 from core.llm_client import LLMClient
+from core.llm_pool import llm_pool
+from core.executors import executors
+from settings import settings
+
+
+# progress(stage, done, total) reported by process_book
+ProgressCallback = Callable[[str, int, int], Awaitable[None]]
 
 
 class RAGService:
@@ -32,44 +44,163 @@ class RAGService:
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap
         )
-        self.embedding_service = EmbeddingService(model_name=embedding_model)
-        self.vector_store = VectorStore()
-        self.vector_store.set_embedding_function(self.embedding_service.embeddings)
+        self.embedding_service = EmbeddingService(
+            model_name=embedding_model,
+            base_url=settings.ollama_base_url
+        )
+        self.vector_store = create_vector_store(self.embedding_service.embeddings)
+        self.answer_cache = AnswerCache.from_settings()
+        self.ingestion_progress = IngestionProgress.from_settings()
     
-    async def process_book(self, epub_path: str) -> Dict[str, Any]:
+    async def process_book(
+        self,
+        epub_path: str,
+        progress: Optional[ProgressCallback] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
         """
         Process a book: extract text, chunk, embed, and store in vector DB.
         
+        The book is streamed chapter → chunks → embedding batches → upsert, with
+        bounded queues between the stages: memory stays flat however long the
+        book is, and chunks are stored as soon as their batch is embedded.
+        Every chunk keeps chapter_index and char_start/char_end (offsets in the
+        chapter text) in its metadata.
+        
+        Re-indexing is idempotent and incremental: chunks have deterministic ids
+        (book id hash + chunk hash), a completely indexed unchanged EPUB is
+        skipped, and otherwise only chunks not stored yet are embedded (including
+        what an interrupted run left) while stale ones are deleted at the end.
+        
         Args:
             epub_path: Path to EPUB file
+            progress: Optional async callback called with (stage, chunks_done, chunks_total);
+                      chunks_total grows as chapters are chunked
+            force: Re-chunk the book even if the EPUB is unchanged
             
         Returns:
             Dictionary with processing results
         """
-        # Extract text
-        text = await self.epub_service.extract_text_from_book(epub_path)
-        
+        async def report(stage: str, done: int = 0, total: int = 0) -> None:
+            if progress is not None:
+                await progress(stage, done, total)
+
         # Get book identifier
         book_id = Path(epub_path).stem
-        
-        # Chunk text
-        documents = self.text_processor.chunk_text(
-            text,
-            metadata={"book_id": book_id, "source": epub_path}
-        )
-        
-        # Add to vector store
-        doc_ids = self.vector_store.add_documents(
-            documents,
-            book_id=book_id
+
+        # Skip the book if the last run for this exact file completed
+        await report("hashing")
+        book_hash = await executors.run_io(file_sha256, epub_path)
+        stored_ids = await executors.run_io(self.vector_store.get_book_ids, book_id)
+        if stored_ids and not force and self.ingestion_progress.is_complete(book_id, book_hash):
+            return {
+                "book_id": book_id,
+                "total_chunks": len(stored_ids),
+                "new_chunks": 0,
+                "deleted_chunks": 0,
+                "skipped": True,
+                "document_ids": sorted(stored_ids)
+            }
+
+        metadata = {"book_id": book_id, "source": epub_path, "book_hash": book_hash}
+        batch_size = settings.embedding_batch_size * settings.embedding_max_in_flight
+        # Bounded queues: a stage waits when the next one falls behind
+        to_embed: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.ingestion_queue_depth))
+        to_store: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.ingestion_queue_depth))
+        doc_ids: List[str] = []
+        counts = {"new": 0, "embedded": 0, "stored": 0, "chapters": 0}
+
+        await report("embedding", 0, 0)
+
+        async def chunk_chapters() -> None:
+            # Batches carry the number of chapters whose chunks are all in this or an earlier batch
+            seen: Dict[str, int] = {}
+            pending: List[Tuple[str, Document]] = []
+            chapter_index = -1
+            async for chapter_index, _, text in self.epub_service.iter_chapter_texts(epub_path):
+                documents = await executors.run_cpu(
+                    self.text_processor.chunk_chapter, text, chapter_index, len(doc_ids), metadata
+                )
+                ids = self.vector_store.make_chunk_ids(book_id, documents, seen)
+                doc_ids.extend(ids)
+                counts["new"] += sum(1 for doc_id in ids if doc_id not in stored_ids)
+                pending.extend(zip(ids, documents))
+                while len(pending) >= batch_size:
+                    await to_embed.put((pending[:batch_size], chapter_index))
+                    pending = pending[batch_size:]
+            counts["chapters"] = chapter_index + 1
+            await to_embed.put((pending, counts["chapters"]))
+            await to_embed.put(None)
+
+        async def embed_batches() -> None:
+            while (item := await to_embed.get()) is not None:
+                batch, chapters_done = item
+                new = [(doc_id, doc) for doc_id, doc in batch if doc_id not in stored_ids]
+                vectors = await self.embedding_service.aembed_documents([doc.page_content for _, doc in new])
+                await to_store.put((batch, new, vectors, chapters_done))
+            await to_store.put(None)
+
+        async def store_batches() -> None:
+            while (item := await to_store.get()) is not None:
+                batch, new, vectors, chapters_done = item
+                if new:
+                    await executors.run_io(
+                        self.vector_store.upsert_embeddings,
+                        [doc for _, doc in new],
+                        [doc_id for doc_id, _ in new],
+                        vectors
+                    )
+                # Chunks stored by an earlier run only get their metadata refreshed
+                existing = [(doc_id, doc) for doc_id, doc in batch if doc_id in stored_ids]
+                if existing:
+                    await executors.run_io(
+                        self.vector_store.update_metadata,
+                        [doc_id for doc_id, _ in existing],
+                        [doc.metadata for _, doc in existing]
+                    )
+                counts["embedded"] += len(new)
+                counts["stored"] += len(batch)
+                await executors.run_io(
+                    self.ingestion_progress.update, book_id, book_hash, chapters_done, counts["stored"]
+                )
+                await report("embedding", counts["embedded"], counts["new"])
+
+        await self._run_stages(chunk_chapters(), embed_batches(), store_batches())
+
+        await report("cleanup", counts["embedded"], counts["new"])
+        stale_ids = stored_ids - set(doc_ids)
+        if stale_ids:
+            await executors.run_io(self.vector_store.delete_ids, stale_ids, book_id=book_id)
+        await executors.run_io(
+            self.ingestion_progress.update, book_id, book_hash, counts["chapters"], len(doc_ids), True
         )
+
+        # Answers were generated from the previous chunks
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate_book(book_id)
         
         return {
             "book_id": book_id,
-            "total_chunks": len(documents),
+            "total_chunks": len(doc_ids),
+            "new_chunks": counts["embedded"],
+            "deleted_chunks": len(stale_ids),
+            "skipped": False,
             "document_ids": doc_ids
         }
     
+    @staticmethod
+    async def _run_stages(*stages: Awaitable[None]) -> None:
+        # A failing stage cancels the others, which would otherwise wait on its queue forever
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     def search(
         self,
         query: str,
@@ -94,43 +225,132 @@ class RAGService:
             filter=filter_dict
         )
     
+    async def _retrieve(self, query_vector: List[float], book_id: Optional[str], k: int = 4) -> List[Document]:
+        filter_dict = {"book_id": book_id} if book_id else None
+        return await executors.run_io(
+            self.vector_store.similarity_search_by_vector,
+            query_vector,
+            k=k,
+            filter=filter_dict
+        )
+    
+    @staticmethod
+    def _build_prompt(question: str, context_docs: List[Document]) -> str:
+        # Build context from documents
+        context = "\n\n".join([doc.page_content for doc in context_docs])
+        
+        return f"""Answer the following question based on the provided context from the book.
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:"""
+    
+    @staticmethod
+    def _llm_client(llm_client: Optional[LLMClient]) -> AsyncContextManager[LLMClient]:
+        # A pooled client by default, returned to the pool when the generation ends
+        return llm_pool.client() if llm_client is None else nullcontext(llm_client)
+    
     async def answer_question(
         self,
         question: str,
         book_id: Optional[str] = None,
-        llm_client: Optional[LLMClient] = None
+        llm_client: Optional[LLMClient] = None,
+        book_version: Optional[str] = None
     ) -> str:
         """
         Answer a question using RAG.
         
+        Answers are cached per book version when book_id and book_version are
+        given: an exact normalized question returns the stored answer, and with
+        a similarity threshold configured so does a close enough question.
+        
         Args:
             question: Question to answer
             book_id: Optional book ID to search in
-            llm_client: Optional LLM client (uses default if not provided)
+            llm_client: Optional LLM client (uses the shared pool if not provided)
+            book_version: Version tag of the book file, enables the answer cache
             
         Returns:
             Answer string
         """
-        # Search for relevant context
-        context_docs = self.search(question, book_id=book_id, k=4)
+        cache = self.answer_cache if book_id and book_version else None
+        if cache is not None:
+            answer = cache.get(book_id, book_version, question)
+            if answer is not None:
+                return answer
         
-        # Build context from documents
-        context = "\n\n".join([doc.page_content for doc in context_docs])
+        # The query embedding is shared by the semantic cache and the search
+        query_vector = await self.embedding_service.aembed_query(question)
+        if cache is not None:
+            answer = cache.get_similar(book_id, book_version, query_vector)
+            if answer is not None:
+                return answer
         
-        # Create prompt
-        prompt = f"""Answer the following question based on the provided context from the book.
-
-Context:
-{context}
-
-Question: {question}
-
-Answer:"""
+        # Search for relevant context
+        context_docs = await self._retrieve(query_vector, book_id)
+        prompt = self._build_prompt(question, context_docs)
         
-        # Get LLM client
-        if llm_client is None:
-            llm_client = LLMClient.from_settings()
+        # Generate answer without blocking the event loop
+        async with self._llm_client(llm_client) as client:
+            answer = await client.agenerate(prompt)
         
-        # Generate answer
-        answer = llm_client.llm.invoke(prompt)
+        # Empty answers mean the book is not indexed yet, don't keep them
+        if cache is not None and answer and answer.strip():
+            cache.put(book_id, book_version, question, answer, query_vector)
         return answer
+    
+    async def stream_answer(
+        self,
+        question: str,
+        book_id: Optional[str] = None,
+        llm_client: Optional[LLMClient] = None,
+        book_version: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Answer a question using RAG, yielding events as they become available.
+        
+        Events are ("sources", documents) right after retrieval, then ("token", text)
+        for each generated piece, then ("done", answer). A cached answer is sent
+        as a single token. Nothing is generated if retrieval finds no context.
+        
+        Args:
+            question: Question to answer
+            book_id: Optional book ID to search in
+            llm_client: Optional LLM client (uses the shared pool if not provided)
+            book_version: Version tag of the book file, enables the answer cache
+            
+        Yields:
+            (event, payload) tuples
+        """
+        cache = self.answer_cache if book_id and book_version else None
+        query_vector = await self.embedding_service.aembed_query(question)
+        context_docs = await self._retrieve(query_vector, book_id)
+        yield "sources", context_docs
+        if not context_docs:
+            yield "done", ""
+            return
+        
+        answer = None
+        if cache is not None:
+            answer = cache.get(book_id, book_version, question)
+            if answer is None:
+                answer = cache.get_similar(book_id, book_version, query_vector)
+        if answer is not None:
+            yield "token", answer
+            yield "done", answer
+            return
+        
+        prompt = self._build_prompt(question, context_docs)
+        pieces: List[str] = []
+        async with self._llm_client(llm_client) as client:
+            async for piece in client.astream(prompt):
+                pieces.append(piece)
+                yield "token", piece
+        
+        answer = "".join(pieces)
+        if cache is not None and answer.strip():
+            cache.put(book_id, book_version, question, answer, query_vector)
+        yield "done", answer
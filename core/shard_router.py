@@ -0,0 +1,114 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+SHARD_MODES = ("none", "book", "bucket")
+
+
+class ShardRouter:
+    """
+    Routing table from book id to the Chroma collection holding its chunks.
+
+    In "book" mode every book gets its own collection; in "bucket" mode books
+    are spread over a fixed number of collections by hash of the book id. The
+    assignment is persisted when a book is first stored and never recomputed,
+    so books keep their collection if the mode or bucket count changes later.
+
+    Example:
+        router = ShardRouter("./data/chroma_db/shards.sqlite3", mode="bucket", buckets=16)
+        collection_name = router.route("my_book", create=True)
+    """
+
+    def __init__(self, path: str, mode: str = "book", buckets: int = 16, prefix: str = "books"):
+        """
+        Initialize routing table.
+
+        Args:
+            path: SQLite database file
+            mode: "book" (collection per book) or "bucket" (collection per hash bucket)
+            buckets: Number of buckets in "bucket" mode
+            prefix: Collection name prefix
+        """
+        if mode not in ("book", "bucket"):
+            raise ValueError(f"Unsupported shard mode: '{mode}'. Use 'book' or 'bucket'")
+        self.path = path
+        self.mode = mode
+        self.buckets = max(1, buckets)
+        self.prefix = prefix
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS routes (book_id TEXT PRIMARY KEY, collection TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._routes: Dict[str, str] = dict(self._conn.execute("SELECT book_id, collection FROM routes"))
+
+    def collection_for(self, book_id: str) -> str:
+        """
+        Compute the collection a new book is assigned to.
+
+        Args:
+            book_id: Book identifier
+
+        Returns:
+            Collection name (valid Chroma name for any book id)
+        """
+        digest = hashlib.sha1(book_id.encode("utf-8")).hexdigest()
+        if self.mode == "book":
+            return f"{self.prefix}-book-{digest[:16]}"
+        return f"{self.prefix}-bucket-{int(digest[:8], 16) % self.buckets:04d}"
+
+    def route(self, book_id: str, create: bool = False) -> Optional[str]:
+        """
+        Get the collection of a book.
+
+        Args:
+            book_id: Book identifier
+            create: Assign and persist a collection if the book has none
+
+        Returns:
+            Collection name, or None for an unknown book when create is False
+        """
+        name = self._routes.get(book_id)
+        if name is None and create:
+            name = self.collection_for(book_id)
+            with self._lock:
+                self._conn.execute("INSERT OR IGNORE INTO routes VALUES (?, ?)", (book_id, name))
+                self._conn.commit()
+                self._routes.setdefault(book_id, name)
+                name = self._routes[book_id]
+        return name
+
+    def remove(self, book_id: str) -> Optional[str]:
+        """
+        Forget a book.
+
+        Args:
+            book_id: Book identifier
+
+        Returns:
+            Collection the book was stored in, if any
+        """
+        with self._lock:
+            name = self._routes.pop(book_id, None)
+            self._conn.execute("DELETE FROM routes WHERE book_id = ?", (book_id,))
+            self._conn.commit()
+        return name
+
+    def books(self) -> List[str]:
+        return list(self._routes)
+
+    def books_in(self, collection_name: str) -> List[str]:
+        return [book_id for book_id, name in self._routes.items() if name == collection_name]
+
+    def collections(self) -> List[str]:
+        return sorted(set(self._routes.values()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from settings import settings
@@ -68,3 +68,66 @@ class TextProcessor:
             )
         
         return documents
+    
+    def split_with_offsets(self, text: str) -> List[Tuple[str, int]]:
+        """
+        Split text into chunks and locate each chunk in the text.
+        
+        Args:
+            text: Text to split
+            
+        Returns:
+            List of (chunk, start offset) tuples
+        """
+        chunks = []
+        index = 0
+        previous_length = 0
+        for chunk in self.text_splitter.split_text(text):
+            # Chunks overlap, so the next one starts at most chunk_overlap before the previous end
+            offset = index + previous_length - self.chunk_overlap
+            index = text.find(chunk, max(0, offset))
+            if index < 0:
+                index = text.find(chunk)
+            previous_length = len(chunk)
+            chunks.append((chunk, index))
+        return chunks
+    
+    def chunk_chapter(
+        self,
+        text: str,
+        chapter_index: int,
+        first_chunk_index: int = 0,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """
+        Split one chapter into chunks that keep their position in the book.
+        
+        Args:
+            text: Chapter text
+            chapter_index: Position of the chapter in the spine
+            first_chunk_index: Book-wide index of the chapter's first chunk
+            metadata: Optional metadata to add to all chunks
+            
+        Returns:
+            List of Document objects with chapter_index, chunk_index,
+            char_start and char_end (offsets in the chapter text) metadata
+        """
+        documents = []
+        for i, (chunk, start) in enumerate(self.split_with_offsets(text)):
+            doc_metadata = {
+                "chunk_index": first_chunk_index + i,
+                "chapter_index": chapter_index,
+                "char_start": start,
+                "char_end": start + len(chunk)
+            }
+            if metadata:
+                doc_metadata.update(metadata)
+            
+            documents.append(
+                Document(
+                    page_content=chunk,
+                    metadata=doc_metadata
+                )
+            )
+        
+        return documents
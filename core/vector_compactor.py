@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.executors import executors
+from settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class VectorCompactor:
+    """
+    Background job purging orphaned vectors: chunks whose book_id has no
+    EPUB file in the books directory any more (e.g. files removed by hand).
+
+    Example:
+        compactor = VectorCompactor(rag_service, interval=3600)
+        await compactor.start()      # periodic
+        summary = await compactor.run()  # one pass now
+    """
+
+    def __init__(self, rag_service, interval: Optional[float] = None):
+        """
+        Initialize compactor.
+
+        Args:
+            rag_service: RAGService whose vector store and answer cache are cleaned
+            interval: Seconds between passes, 0 disables the periodic job
+                      (default: vector_compaction_interval from settings)
+        """
+        self.rag_service = rag_service
+        self.interval = settings.vector_compaction_interval if interval is None else interval
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_summary: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _present_book_ids() -> set:
+        books_path = settings.books_path
+        if not os.path.isdir(books_path):
+            return set()
+        return {Path(filename).stem for filename in os.listdir(books_path) if filename.endswith('.epub')}
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run one compaction pass.
+
+        Returns:
+            Summary with the purged book ids and number of deleted chunks
+        """
+        async with self._lock:
+            started = time.time()
+            vector_store = self.rag_service.vector_store
+            stored = await executors.run_io(vector_store.stored_book_ids)
+            # Listed after the store, so a book uploaded meanwhile is not taken for an orphan
+            present = await executors.run_io(self._present_book_ids)
+
+            purged: Dict[str, int] = {}
+            for book_id in sorted(stored - present):
+                purged[book_id] = await executors.run_io(vector_store.delete_book, book_id)
+                await executors.run_io(self.rag_service.ingestion_progress.forget, book_id)
+                if self.rag_service.answer_cache is not None:
+                    self.rag_service.answer_cache.invalidate_book(book_id)
+
+            self.last_summary = {
+                "started_at": started,
+                "elapsed_seconds": round(time.time() - started, 3),
+                "books_checked": len(stored),
+                "purged_books": sorted(purged),
+                "deleted_chunks": sum(purged.values()),
+            }
+            return self.last_summary
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run()
+            except Exception:
+                # Try again on the next tick
+                logger.exception("Periodic vector compaction failed")
+
+    async def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "last_run": self.last_summary,
+        }
@@ -1,36 +1,50 @@
-from typing import List, Optional, Dict, Any
+import hashlib
+import heapq
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Iterable, Set, Tuple
 from pathlib import Path
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from langchain_community.vectorstores import Chroma
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
+from core.shard_router import SHARD_MODES, ShardRouter
 from settings import settings
 
 
 class VectorStore:
     """
     ChromaDB vector store client for storing and retrieving book embeddings.
+    
+    With sharding enabled ("book" or "bucket" mode) each book's chunks live in
+    the collection given by a persisted routing table instead of one shared
+    collection: per-book queries search a small index, and searches without a
+    book filter fan out over all shards and merge the results by distance.
     """
     
     def __init__(
         self,
         collection_name: str = "books",
         persist_directory: Optional[str] = None,
-        embedding_function: Optional[Embeddings] = None
+        embedding_function: Optional[Embeddings] = None,
+        shard_mode: Optional[str] = None,
+        shard_buckets: Optional[int] = None
     ):
         """
         Initialize ChromaDB vector store.
         
         Args:
-            collection_name: Name of the ChromaDB collection
+            collection_name: Name of the ChromaDB collection (shard name prefix when sharded)
             persist_directory: Directory to persist data (None = in-memory)
             embedding_function: LangChain embedding function
+            shard_mode: "none", "book" or "bucket" (default: from settings)
+            shard_buckets: Number of collections in "bucket" mode (default: from settings)
         """
+        shard_mode = shard_mode or settings.vector_shard_mode
+        if shard_mode not in SHARD_MODES:
+            raise ValueError(f"Unsupported shard mode: '{shard_mode}'. Use one of: {', '.join(SHARD_MODES)}")
         self.collection_name = collection_name
-        self.persist_directory = persist_directory or getattr(
-            settings, "chroma_persist_dir", "./chroma_db"
-        )
+        self.persist_directory = persist_directory or settings.chroma_persist_dir
         
         # Create persist directory if it doesn't exist
         Path(self.persist_directory).mkdir(parents=True, exist_ok=True)
@@ -44,8 +58,19 @@ class VectorStore:
         # Store embedding function
         self.embedding_function = embedding_function
         
-        # Initialize LangChain Chroma wrapper
-        self._vectorstore: Optional[Chroma] = None
+        # Initialize LangChain Chroma wrappers, one per collection
+        self._vectorstores: Dict[str, Chroma] = {}
+        
+        # Routing table of the sharded modes
+        self.shard_mode = shard_mode
+        self.router: Optional[ShardRouter] = None
+        if shard_mode != "none":
+            self.router = ShardRouter(
+                str(Path(self.persist_directory) / f"{collection_name}_shards.sqlite3"),
+                mode=shard_mode,
+                buckets=shard_buckets or settings.vector_shard_buckets,
+                prefix=collection_name
+            )
     
     @property
     def vectorstore(self) -> Chroma:
@@ -55,17 +80,197 @@ class VectorStore:
         Returns:
             LangChain Chroma vectorstore instance
         """
-        if self._vectorstore is None:
+        return self._store(self.collection_name)
+    
+    def _store(self, collection_name: str) -> Chroma:
+        if collection_name not in self._vectorstores:
             if self.embedding_function is None:
                 raise ValueError("Embedding function must be set before using vectorstore")
             
-            self._vectorstore = Chroma(
+            self._vectorstores[collection_name] = Chroma(
                 client=self.client,
-                collection_name=self.collection_name,
+                collection_name=collection_name,
                 embedding_function=self.embedding_function,
                 persist_directory=self.persist_directory
             )
-        return self._vectorstore
+        return self._vectorstores[collection_name]
+    
+    @property
+    def collection(self):
+        """
+        Get the raw ChromaDB collection (created if missing).
+        
+        Returns:
+            ChromaDB collection
+        """
+        return self.client.get_or_create_collection(self.collection_name)
+    
+    @property
+    def sharded(self) -> bool:
+        return self.router is not None
+    
+    def route(self, book_id: Optional[str], create: bool = False) -> Optional[str]:
+        """
+        Get the name of the collection holding a book's chunks.
+        
+        Args:
+            book_id: Book identifier
+            create: Assign a shard to a book that has none yet
+            
+        Returns:
+            Collection name, or None if the book has no shard
+        """
+        if self.router is None:
+            return self.collection_name
+        if book_id is None:
+            raise ValueError("Chunks need a book_id in their metadata when the vector store is sharded")
+        return self.router.route(book_id, create=create)
+    
+    def _group_by_collection(self, metadatas: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+        # Positions of the records that go to each collection
+        groups: Dict[str, List[int]] = defaultdict(list)
+        for position, metadata in enumerate(metadatas):
+            groups[self.route((metadata or {}).get("book_id"), create=True)].append(position)
+        return groups
+    
+    def _search_collections(self, filter: Optional[Dict[str, Any]]) -> List[str]:
+        # Collections a search with this filter has to look at
+        if self.router is None:
+            return [self.collection_name]
+        book_id = (filter or {}).get("book_id")
+        if isinstance(book_id, str):
+            name = self.router.route(book_id)
+            return [name] if name is not None else []
+        return self.router.collections()
+    
+    @staticmethod
+    def make_chunk_ids(
+        book_id: str,
+        documents: List[Document],
+        seen: Optional[Dict[str, int]] = None
+    ) -> List[str]:
+        """
+        Build deterministic chunk ids: hash of the book id + hash of the chunk text.
+        Repeated texts within a book get an occurrence suffix.
+        
+        Args:
+            book_id: Book identifier
+            documents: Chunks of the book
+            seen: Occurrence counts carried over between calls when a book's
+                  chunks are passed in several parts (updated in place)
+            
+        Returns:
+            List of ids, one per document
+        """
+        book_key = hashlib.sha1(book_id.encode("utf-8")).hexdigest()[:16]
+        if seen is None:
+            seen = {}
+        ids = []
+        for doc in documents:
+            chunk_key = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:32]
+            occurrence = seen.get(chunk_key, 0)
+            seen[chunk_key] = occurrence + 1
+            ids.append(f"{book_key}-{chunk_key}" + (f"-{occurrence}" if occurrence else ""))
+        return ids
+    
+    def get_book_ids(self, book_id: str, where: Optional[Dict[str, Any]] = None) -> Set[str]:
+        """
+        Get ids of all stored chunks of a book without loading documents or embeddings.
+        
+        Args:
+            book_id: Book identifier
+            where: Optional extra metadata conditions
+            
+        Returns:
+            Set of chunk ids
+        """
+        condition: Dict[str, Any] = {"book_id": book_id}
+        if where:
+            condition = {"$and": [condition, *({k: v} for k, v in where.items())]}
+        name = self.route(book_id)
+        if name is None:
+            return set()
+        results = self.client.get_or_create_collection(name).get(where=condition, include=[])
+        return set(results["ids"])
+    
+    def upsert_documents(self, documents: List[Document], ids: List[str]) -> List[str]:
+        """
+        Embed and insert or replace documents under the given ids.
+        
+        Args:
+            documents: LangChain Document objects
+            ids: Ids for the documents
+            
+        Returns:
+            List of document IDs
+        """
+        stored_ids: List[str] = []
+        for name, positions in self._group_by_collection([doc.metadata for doc in documents]).items():
+            stored_ids += self._store(name).add_documents(
+                [documents[i] for i in positions], ids=[ids[i] for i in positions]
+            )
+        return stored_ids
+    
+    def upsert_embeddings(
+        self,
+        documents: List[Document],
+        ids: List[str],
+        embeddings: List[List[float]]
+    ) -> None:
+        """
+        Insert or replace documents with precomputed embedding vectors.
+        
+        Args:
+            documents: LangChain Document objects
+            ids: Ids for the documents
+            embeddings: One vector per document
+        """
+        for name, positions in self._group_by_collection([doc.metadata for doc in documents]).items():
+            self.client.get_or_create_collection(name).upsert(
+                ids=[ids[i] for i in positions],
+                embeddings=[embeddings[i] for i in positions],
+                documents=[documents[i].page_content for i in positions],
+                metadatas=[documents[i].metadata for i in positions]
+            )
+    
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]], batch_size: int = 1000) -> None:
+        """
+        Replace metadata of stored chunks without re-embedding them.
+        
+        Args:
+            ids: Chunk ids
+            metadatas: New metadata, one per id
+            batch_size: Ids per request
+        """
+        for name, positions in self._group_by_collection(metadatas).items():
+            collection = self.client.get_or_create_collection(name)
+            for start in range(0, len(positions), batch_size):
+                batch = positions[start:start + batch_size]
+                collection.update(
+                    ids=[ids[i] for i in batch],
+                    metadatas=[metadatas[i] for i in batch]
+                )
+    
+    def delete_ids(self, ids: Iterable[str], batch_size: int = 1000, book_id: Optional[str] = None) -> None:
+        """
+        Delete chunks by id.
+        
+        Args:
+            ids: Chunk ids
+            batch_size: Ids per request
+            book_id: Book the chunks belong to (when sharded, limits the delete to its shard)
+        """
+        ids = list(ids)
+        if self.router is None:
+            names = [self.collection_name]
+        elif book_id is not None:
+            names = [name for name in [self.router.route(book_id)] if name is not None]
+        else:
+            names = self.router.collections()
+        for name in names:
+            collection = self.client.get_or_create_collection(name)
+            for start in range(0, len(ids), batch_size):
+                collection.delete(ids=ids[start:start + batch_size])
     
     def set_embedding_function(self, embedding_function: Embeddings) -> None:
         """
@@ -75,7 +280,7 @@ class VectorStore:
             embedding_function: LangChain embedding function
         """
         self.embedding_function = embedding_function
-        self._vectorstore = None  # Reset to force recreation
+        self._vectorstores = {}  # Reset to force recreation
     
     def add_documents(
         self,
@@ -101,7 +306,16 @@ class VectorStore:
                     doc.metadata = {}
                 doc.metadata["book_id"] = book_id
         
-        return self.vectorstore.add_documents(documents, **kwargs)
+        if self.router is None:
+            return self.vectorstore.add_documents(documents, **kwargs)
+        
+        ids = kwargs.pop("ids", None)
+        stored_ids: List[str] = []
+        for name, positions in self._group_by_collection([doc.metadata for doc in documents]).items():
+            if ids is not None:
+                kwargs["ids"] = [ids[i] for i in positions]
+            stored_ids += self._store(name).add_documents([documents[i] for i in positions], **kwargs)
+        return stored_ids
     
     def similarity_search(
         self,
@@ -122,12 +336,42 @@ class VectorStore:
         Returns:
             List of similar documents
         """
-        return self.vectorstore.similarity_search(
-            query,
-            k=k,
-            filter=filter,
-            **kwargs
-        )
+        if self.router is None:
+            return self.vectorstore.similarity_search(
+                query,
+                k=k,
+                filter=filter,
+                **kwargs
+            )
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter, **kwargs)]
+    
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> List[Document]:
+        """
+        Search for documents similar to an already computed query embedding.
+        
+        Args:
+            embedding: Query embedding vector
+            k: Number of results to return
+            filter: Optional metadata filter
+            **kwargs: Additional search parameters
+            
+        Returns:
+            List of similar documents
+        """
+        if self.router is None:
+            return self.vectorstore.similarity_search_by_vector(
+                embedding,
+                k=k,
+                filter=filter,
+                **kwargs
+            )
+        return [doc for doc, _ in self._sharded_search(embedding, k, filter, **kwargs)]
     
     def similarity_search_with_score(
         self,
@@ -148,30 +392,97 @@ class VectorStore:
         Returns:
             List of tuples (document, score)
         """
-        return self.vectorstore.similarity_search_with_score(
-            query,
-            k=k,
-            filter=filter,
-            **kwargs
-        )
+        if self.router is None:
+            return self.vectorstore.similarity_search_with_score(
+                query,
+                k=k,
+                filter=filter,
+                **kwargs
+            )
+        if self.embedding_function is None:
+            raise ValueError("Embedding function must be set before using vectorstore")
+        return self._sharded_search(self.embedding_function.embed_query(query), k, filter, **kwargs)
     
-    def delete_book(self, book_id: str) -> None:
+    def _sharded_search(
+        self,
+        embedding: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]],
+        **kwargs
+    ) -> List[Tuple[Document, float]]:
+        # Top k of every shard, merged by distance (lower is closer)
+        results: List[Tuple[Document, float]] = []
+        for name in self._search_collections(filter):
+            results += self._store(name).similarity_search_by_vector_with_relevance_scores(
+                embedding,
+                k=k,
+                filter=filter,
+                **kwargs
+            )
+        return heapq.nsmallest(k, results, key=lambda result: result[1])
+    
+    @staticmethod
+    def _delete_where(collection, where: Dict[str, Any], batch_size: int) -> int:
+        # Fetch ids only (no documents, metadata or embeddings), one batch at a time
+        deleted = 0
+        while True:
+            ids = collection.get(where=where, include=[], limit=batch_size)["ids"]
+            if not ids:
+                return deleted
+            collection.delete(ids=ids)
+            deleted += len(ids)
+    
+    def delete_book(self, book_id: str, batch_size: int = 1000) -> int:
         """
         Delete all documents for a specific book.
         
         Args:
             book_id: Book identifier
+            batch_size: Ids fetched and deleted per request
+            
+        Returns:
+            Number of deleted chunks
         """
-        # Get collection
-        collection = self.client.get_collection(self.collection_name)
+        if self.router is not None:
+            name = self.router.route(book_id)
+            if name is None:
+                return 0
+            collection = self.client.get_or_create_collection(name)
+            if self.router.mode == "book":
+                # The whole collection belongs to the book
+                deleted = collection.count()
+                self.client.delete_collection(name)
+                self._vectorstores.pop(name, None)
+            else:
+                deleted = self._delete_where(collection, {"book_id": book_id}, batch_size)
+            self.router.remove(book_id)
+            return deleted
         
-        # Get all documents with this book_id
-        results = collection.get(
-            where={"book_id": book_id}
-        )
+        return self._delete_where(self.collection, {"book_id": book_id}, batch_size)
+    
+    def stored_book_ids(self, batch_size: int = 5000) -> Set[str]:
+        """
+        Get the ids of all books that have chunks in the store.
         
-        if results["ids"]:
-            collection.delete(ids=results["ids"])
+        Args:
+            batch_size: Records scanned per request (unsharded store)
+            
+        Returns:
+            Set of book identifiers
+        """
+        if self.router is not None:
+            return set(self.router.books())
+        
+        # Metadata only, no documents or embeddings
+        collection = self.collection
+        book_ids: Set[str] = set()
+        offset = 0
+        while True:
+            metadatas = collection.get(include=["metadatas"], limit=batch_size, offset=offset)["metadatas"]
+            if not metadatas:
+                return book_ids
+            book_ids.update(metadata["book_id"] for metadata in metadatas if metadata and "book_id" in metadata)
+            offset += len(metadatas)
     
     def get_collection_info(self) -> Dict[str, Any]:
         """
@@ -180,9 +491,87 @@ class VectorStore:
         Returns:
             Dictionary with collection information
         """
+        if self.router is not None:
+            counts = {name: self.client.get_or_create_collection(name).count() for name in self.router.collections()}
+            return {
+                "collection_name": self.collection_name,
+                "count": sum(counts.values()),
+                "persist_directory": self.persist_directory,
+                "shard_mode": self.shard_mode,
+                "shards": len(counts),
+                "books": len(self.router.books()),
+                "largest_shard": max(counts.values(), default=0)
+            }
+        
         collection = self.client.get_collection(self.collection_name)
         return {
             "collection_name": self.collection_name,
             "count": collection.count(),
             "persist_directory": self.persist_directory
         }
+    
+    def migrate_from_collection(
+        self,
+        source_collection_name: str,
+        batch_size: int = 500,
+        delete_source: bool = False
+    ) -> Dict[str, int]:
+        """
+        Copy every chunk of an unsharded collection into this store's shards,
+        keeping ids, documents, metadata and embeddings (nothing is re-embedded).
+        Safe to re-run: chunks are upserted under their existing ids.
+        
+        Args:
+            source_collection_name: Collection to copy from (e.g. the old "books")
+            batch_size: Records read and written per request
+            delete_source: Drop the source collection once everything is copied
+            
+        Returns:
+            Number of copied chunks and of books routed
+        """
+        if self.router is None:
+            raise ValueError("Migration target must be sharded: set shard_mode to 'book' or 'bucket'")
+        source = self.client.get_collection(source_collection_name)
+        copied = 0
+        offset = 0
+        while True:
+            batch = source.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset
+            )
+            if not batch["ids"]:
+                break
+            metadatas = batch["metadatas"]
+            for name, positions in self._group_by_collection(metadatas).items():
+                self.client.get_or_create_collection(name).upsert(
+                    ids=[batch["ids"][i] for i in positions],
+                    embeddings=[batch["embeddings"][i] for i in positions],
+                    documents=[batch["documents"][i] for i in positions],
+                    metadatas=[metadatas[i] for i in positions]
+                )
+            copied += len(batch["ids"])
+            offset += len(batch["ids"])
+        
+        if delete_source:
+            self.client.delete_collection(source_collection_name)
+        return {"chunks": copied, "books": len(self.router.books())}
+
+
+def create_vector_store(embedding_function: Optional[Embeddings] = None):
+    """
+    Create the vector store backend selected in settings.
+    
+    Args:
+        embedding_function: LangChain embedding function
+        
+    Returns:
+        VectorStore (Chroma) or NumpyVectorStore, both with the same interface
+    """
+    if settings.vector_backend == "numpy":
+        # numpy backend imports VectorStore itself
+        from core.numpy_vector_store import NumpyVectorStore
+        return NumpyVectorStore(embedding_function=embedding_function)
+    if settings.vector_backend != "chroma":
+        raise ValueError(f"Unsupported vector backend: '{settings.vector_backend}'. Use 'chroma' or 'numpy'")
+    return VectorStore(embedding_function=embedding_function)
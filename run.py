@@ -1,12 +1,33 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from settings import settings
 
-from api.routes.books import router as book_router
+from api.routes.books import router as book_router, ingestion_queue, rag_service
+from api.routes.admin import router as admin_router, vector_compactor
+from api.services.book_catalog import book_catalog
+from core.executors import executors
+from core.llm_pool import llm_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    llm_pool.start()
+    await book_catalog.start()
+    await vector_compactor.start()
+    await ingestion_queue.start()
+    yield
+    await vector_compactor.stop()
+    await ingestion_queue.stop()
+    await book_catalog.stop()
+    await rag_service.embedding_service.aclose()
+    await llm_pool.aclose()
+    executors.shutdown()
 
 
 app = FastAPI(
-    title=settings.app_name
+    title=settings.app_name,
+    lifespan=lifespan
 )
 
 
@@ -19,3 +40,4 @@ async def index():
 
 
 app.include_router(book_router)
+app.include_router(admin_router)
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 from typing import Optional, Dict, Any
@@ -5,6 +6,18 @@ from langchain_core.language_models import BaseLanguageModel
 from langchain_ollama import OllamaLLM
 
 
+# Runtime files placed under data_dir unless configured: setting -> name
+_DATA_FILES = {
+    "catalog_path": "book_catalog.sqlite3",
+    "ingestion_journal_path": "ingestion_jobs.jsonl",
+    "ingestion_progress_path": "ingestion_progress.sqlite3",
+    "bulk_index_checkpoint_path": "bulk_index_checkpoints.json",
+    "chroma_persist_dir": "chroma_db",
+    "numpy_index_dir": "numpy_index",
+    "embedding_cache_path": "embedding_cache.sqlite3",
+}
+
+
 class Settings(BaseSettings):
     # Application settings
     app_name: str = "Book Reader API"
@@ -16,6 +29,8 @@ class Settings(BaseSettings):
 
     # Directory settings
     books_dir: str = "./books_stored"
+    # Runtime state (indexes, caches, journals); the *_path/*_dir settings below default to files in it
+    data_dir: str = "./data"
 
     # Database settings (example)
     # database_url: Optional[str] = None
@@ -32,11 +47,80 @@ class Settings(BaseSettings):
     # max_upload_size: int = 100 * 1024 * 1024  # 100MB
     chunk_size: int = 1024 * 1024  # 1MB
 
+    # EPUB cache settings
+    book_structure_cache_size: int = 128  # parsed container.xml/OPF entries
+    archive_pool_size: int = 32  # open EPUB archive handles
+    resource_stream_chunk_size: int = 64 * 1024  # 64KB per streamed resource chunk
+    chapter_cache_max_entries: int = 2048  # rendered chapter pages
+    chapter_cache_max_bytes: int = 128 * 1024 * 1024  # 128MB of rendered chapter pages
+    resource_cache_max_bytes: int = 32 * 1024 * 1024  # 32MB of small EPUB resources (CSS, images)
+
+    # Chapter prefetch settings
+    chapter_prefetch_depth: int = 1  # chapters after the current one to warm, 0 disables prefetch
+    chapter_prefetch_previous: bool = False  # also warm the previous chapter
+    chapter_prefetch_max_concurrency: int = 2  # prefetch tasks running at once, extra ones are skipped
+
+    # Executor settings (0 workers = run inline on the event loop)
+    io_workers: int = 8  # threads for blocking file and archive I/O
+    cpu_workers: int = 4  # workers for HTML/XML parsing
+    cpu_executor: str = "thread"  # "thread" or "process"
+    parallel_workers: int = 0  # processes for fan-out work such as parallel extraction, 0 = CPU count
+
+    # Text extraction settings
+    extract_parallel: bool = False  # fan chapters of a book out to the parallel process pool
+    extract_chapters_per_task: int = 8  # chapters sent to a worker process at once
+    parser_backend: str = "fast"  # "fast" (lxml iterparse + streaming html.parser, BeautifulSoup on errors) or "soup"
+
+    # Book catalog settings
+    catalog_path: Optional[str] = None  # default: <data_dir>/book_catalog.sqlite3
+    catalog_poll_interval: float = 30.0  # seconds between books directory scans, 0 = no polling
+
+    # Ingestion settings
+    ingestion_workers: int = 1  # books processed concurrently in the background
+    ingestion_journal_path: Optional[str] = None  # default: <data_dir>/ingestion_jobs.jsonl
+    ingestion_job_history: int = 200  # finished jobs kept in the journal
+    ingestion_progress_path: Optional[str] = None  # pipeline progress, default: <data_dir>/ingestion_progress.sqlite3
+    ingestion_queue_depth: int = 2  # batches buffered between chunking, embedding and storing
+    embedding_batch_size: int = 64  # chunks embedded and stored per batch
+    bulk_index_workers: int = 2  # books indexed in parallel by the bulk indexer
+    bulk_index_checkpoint_path: Optional[str] = None  # default: <data_dir>/bulk_index_checkpoints.json
+
+    # Vector store settings
+    chroma_persist_dir: Optional[str] = None  # collections and shard routing tables, default: <data_dir>/chroma_db
+    vector_backend: str = "chroma"  # "chroma" or "numpy" (exact search over memory-mapped per-book matrices)
+    numpy_index_dir: Optional[str] = None  # default: <data_dir>/numpy_index
+    numpy_index_dtype: str = "float16"  # "float16" or "int8" (quarter of float32, per-row scale)
+    vector_compaction_interval: float = 3600.0  # seconds between orphaned vector purges, 0 = only on demand
+    vector_shard_mode: str = "none"  # "none" (one collection), "book" (collection per book) or "bucket"
+    vector_shard_buckets: int = 16  # collections in "bucket" mode
+
+    # Embedding cache settings
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: Optional[str] = None  # default: <data_dir>/embedding_cache.sqlite3
+    embedding_cache_max_entries: int = 500_000  # cached vectors before LRU eviction
+    embedding_cache_dtype: str = "float32"  # "float32" or "float16" (half the size, lossy)
+
+    # Embedding client settings
+    embedding_max_in_flight: int = 4  # concurrent /api/embed requests (and pooled connections)
+    embedding_max_retries: int = 3  # retries per batch on connection errors, 429 and 5xx
+    embedding_retry_backoff: float = 0.5  # first retry delay in seconds, doubled per attempt
+    embedding_timeout: float = 120.0  # seconds per /api/embed request
+    query_batching_enabled: bool = True  # coalesce concurrent question embeddings
+    query_batch_window_ms: float = 5.0  # wait for more questions after the first one
+    query_batch_max_size: int = 32  # questions that flush a batch immediately
+
+    # Answer cache settings
+    answer_cache_enabled: bool = True
+    answer_cache_max_entries: int = 1024  # exact (book version, question) answers kept
+    answer_cache_similarity_threshold: Optional[float] = None  # cosine similarity for reusing an answer, None = exact only
+    answer_cache_semantic_max_per_book: int = 256  # question embeddings kept per book
+
     # LLM settings
     default_llm_provider: str = "ollama"
     default_llm_model: str = "gemma3:1b"
     ollama_base_url: str = "http://localhost:11434"
     llm_temperature: float = 0.7
+    llm_pool_size: int = 4  # shared LLM clients, i.e. concurrent generations
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -45,6 +129,14 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
+    @model_validator(mode="after")
+    def _default_data_paths(self) -> "Settings":
+        """Place runtime files that are not configured explicitly under data_dir."""
+        for field, name in _DATA_FILES.items():
+            if getattr(self, field) is None:
+                setattr(self, field, str(Path(self.data_dir) / name))
+        return self
+
     @property
     def books_path(self) -> Path:
         """Get books directory as Path object"""